@@ -0,0 +1,116 @@
+import argparse
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from riscv_assembler.convert import AssemblyConverter
+
+__all__ = ['generate', 'generate_lines', 'FORMATS']
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#synthetic assembly for the benchmarks: seeded, any size, and every
+#mnemonic AssemblyConverter knows about gets written with the operand
+#layout its handler expects
+
+FORMATS = ["R", "I", "S", "SB", "U", "UJ", "pseudo"]
+
+#one label every this many lines, branches pick any of them so there
+#are forward and backward references
+LABEL_EVERY = 16
+
+def _operand(rng):
+	if rng.random() < 0.75:
+		return "[{}]".format(rng.randint(0, 1023))
+	return "x{}".format(rng.randint(0, 31))
+
+def _imm12(rng):
+	return str(rng.randint(-2048, 2047))
+
+def _line(rng, instr, fmt, label):
+	op = lambda: _operand(rng)
+	if fmt == "R":
+		return "{} {} {}".format(instr, op(), op())
+	if fmt == "I":
+		if instr in ("ecall", "ebreak"):
+			return instr
+		return "{} {} {}".format(instr, op(), _imm12(rng))
+	if fmt == "S":
+		return "{} {} {} {}".format(instr, op(), op(), _imm12(rng))
+	if fmt == "SB":
+		return "{} {} {} {}".format(instr, op(), op(), label())
+	if fmt == "U":
+		return "{} {}".format(instr, rng.randint(0, 2**20 - 1))
+	if fmt == "UJ":
+		return "{} {}".format(instr, label())
+
+	#pseudo instructions
+	if instr == "li":
+		return "li {} {}".format(op(), rng.choice([_imm12(rng), str(rng.randint(2**11 + 1, 2**19))]))
+	if instr in ("nop", "ret"):
+		return instr
+	if instr in ("mv", "not", "neg", "seqz", "snez"):
+		return "{} {} {}".format(instr, op(), op())
+	if instr in ("la", "j"):
+		return "{} {}".format(instr, label())
+	if instr == "jr":
+		return "jr {}".format(op())
+	if instr in ("bgt", "ble"):
+		return "{} {} {} {}".format(instr, op(), op(), label())
+	if instr in ("beqz", "bnez"):
+		return "{} {} {}".format(instr, op(), label())
+	raise ValueError("no operand layout for " + instr)
+
+#yields the lines of a program, mix maps format -> weight (default: equal)
+def generate_lines(lines, seed = 0, mix = None):
+	rng = random.Random(seed)
+	mix = mix or dict((f, 1) for f in FORMATS)
+	by_format = dict((f, [x for x, g in AssemblyConverter.formats.items() if g == f]) for f in mix)
+	formats = list(mix.keys())
+	weights = [mix[f] for f in formats]
+
+	n_labels = max(1, lines // LABEL_EVERY)
+	label = lambda: "L{}".format(rng.randrange(n_labels))
+
+	yield "# generated by benchmarks/generate.py, seed={}".format(seed)
+	for i in range(lines):
+		if i % LABEL_EVERY == 0 and i // LABEL_EVERY < n_labels:
+			yield "L{}:".format(i // LABEL_EVERY)
+		fmt = rng.choices(formats, weights)[0]
+		yield _line(rng, rng.choice(by_format[fmt]), fmt, label)
+	yield "nop"
+
+def generate(path, lines, seed = 0, mix = None):
+	with open(path, "w") as f:
+		for line in generate_lines(lines, seed, mix):
+			f.write(line + "\n")
+	return path
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#format weights on the command line, e.g. R=4,I=4,SB=1
+def _parse_mix(x):
+	mix = {}
+	for part in x.split(","):
+		fmt, weight = part.split("=")
+		if fmt not in FORMATS:
+			raise argparse.ArgumentTypeError("unknown format " + fmt)
+		mix[fmt] = float(weight)
+	return mix
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Write a synthetic .s program")
+	parser.add_argument("path")
+	parser.add_argument("--lines", type = int, default = 10000)
+	parser.add_argument("--seed", type = int, default = 0)
+	parser.add_argument("--mix", type = _parse_mix, default = None)
+	args = parser.parse_args(argv)
+	generate(args.path, args.lines, args.seed, args.mix)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+__all__ = ['measure', 'check']
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#startup cost of the package: "import riscv_assembler" plus building the first
+#AssemblyConverter, timed inside a fresh interpreter every run so nothing is
+#cached in sys.modules. The interpreter's own start isn't part of it
+#
+#	python benchmarks/import_time.py --runs 20 --budget 10
+
+#default budget in milliseconds, median of the runs
+BUDGET_MS = 10.0
+
+_PROBE = """
+import time
+start = time.perf_counter()
+import riscv_assembler
+riscv_assembler.AssemblyConverter()
+end = time.perf_counter()
+import sys
+print((end - start)*1000, " ".join(sorted(sys.modules)))
+"""
+
+ROOT = Path(__file__).parent.parent
+
+#the package as setup.py build_py lays it out, built into tmp so the
+#checkout is left alone. The .dat files get fresh mtimes the way an install
+#gives them, a source checkout would otherwise be timed parsing them
+def prepare(tmp):
+	subprocess.run(
+		[sys.executable, "setup.py", "-q", "build_py", "--build-lib", tmp],
+		cwd = str(ROOT), stdout = subprocess.PIPE, stderr = subprocess.PIPE, check = True
+	)
+	data = Path(tmp) / "riscv_assembler" / "data"
+	for name in ("reg_map.dat", "instr_data.dat"):
+		os.utime(str(data / name))
+	return tmp
+
+#(median ms, every run's ms, modules loaded by the last run). The first run
+#only warms up, it writes the .pyc files the others load
+def measure(runs = 10, python = sys.executable):
+	with tempfile.TemporaryDirectory() as tmp:
+		env = dict(os.environ)
+		env["PYTHONPATH"] = prepare(tmp) + os.pathsep + env.get("PYTHONPATH", "")
+		env.pop("PYTHONDONTWRITEBYTECODE", None)
+		times = []
+		modules = []
+		#python -c puts the working directory first on sys.path, run it in
+		#tmp so the copy is the one imported and not a checkout next to it
+		pipes = dict(cwd = tmp, stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True, check = True)
+		subprocess.run([python, "-c", _PROBE], env = env, **pipes)
+		for i in range(runs):
+			out = subprocess.run([python, "-c", _PROBE], env = env, **pipes).stdout
+			ms, names = out.split(" ", 1)
+			times.append(float(ms))
+			modules = names.split()
+	return statistics.median(times), times, modules
+
+#(passed, result dict)
+def check(budget = BUDGET_MS, runs = 10):
+	median, times, modules = measure(runs)
+	return median <= budget, {
+		"median_ms": median,
+		"min_ms": min(times),
+		"budget_ms": budget,
+		#the heavy optional dependencies must stay out of the import
+		"loaded": [m for m in ("bitstring", "numpy", "logging", "concurrent.futures", "hashlib") if m in modules]
+	}
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Time import riscv_assembler plus the first converter")
+	parser.add_argument("--runs", type = int, default = 10)
+	parser.add_argument("--budget", type = float, default = BUDGET_MS, help = "milliseconds")
+	args = parser.parse_args(argv)
+
+	ok, result = check(args.budget, args.runs)
+	json.dump(result, sys.stdout, indent = 1)
+	print()
+	if not ok:
+		print("over budget: {:.2f}ms > {:.2f}ms".format(result["median_ms"], args.budget), file = sys.stderr)
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,157 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from riscv_assembler.convert import AssemblyConverter
+from riscv_assembler.project_convert import ProjectConverter
+from benchmarks.generate import generate
+
+__all__ = ['run', 'compare']
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#throughput/memory benchmarks of the conversion entry points, results are
+#written as json so two versions can be diffed with --compare
+#
+#	python benchmarks/run.py --lines 10000 100000 --out results.json
+#	python benchmarks/run.py --lines 10000 --compare old.json
+
+#files per project in the ProjectConverter cases
+PROJECT_FILES = 8
+
+def _version():
+	try:
+		from importlib.metadata import version
+		return version("riscv-assembler")
+	except Exception:
+		return "unknown"
+
+#name -> callable(path, project_dir), run inside a scratch cwd since
+#convert() writes its outputs relative to it
+def cases():
+	#the returned buffers render lazily, as_text() puts the rendering in the timing
+	def ret(**kw):
+		return lambda path, project: AssemblyConverter(**kw).convert_ret(path).as_text()
+	def conv(output_type, **kw):
+		return lambda path, project: AssemblyConverter(output_type = output_type, **kw).convert(path)
+	def project(workers):
+		return lambda path, project: ProjectConverter(root = project, output_type = 'r', workers = workers).convert()
+
+	return {
+		"convert_ret": ret(),
+		"convert_ret/hex": ret(hexMode = True),
+		"convert_ret/nibble": ret(nibble = True),
+		#the encode cache, off by default, against convert_ret above
+		"convert_ret/cache": ret(cache_size = 4096),
+		"convert/b": conv('b'),
+		"convert/t": conv('t'),
+		"convert/r": lambda path, project: AssemblyConverter(output_type = 'r').convert(path).as_text(),
+		"convert/bt": conv('bt'),
+		"iter_convert": lambda path, project: sum(1 for _ in AssemblyConverter().iter_convert(path)),
+		"project/workers=1": project(1),
+		"project/workers=2": project(2)
+	}
+
+#best of repeat wall times, then one traced run for the peak
+def _measure(fn, path, project, repeat):
+	times = []
+	for i in range(repeat):
+		gc.collect()
+		start = time.perf_counter()
+		fn(path, project)
+		times.append(time.perf_counter() - start)
+
+	gc.collect()
+	tracemalloc.start()
+	fn(path, project)
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return min(times), peak
+
+def run(sizes, seed = 0, repeat = 3, only = None):
+	results = []
+	scratch = tempfile.mkdtemp(prefix = "riscv-bench-")
+	cwd = os.getcwd()
+	try:
+		os.chdir(scratch)
+		for lines in sizes:
+			path = generate(os.path.join(scratch, "bench{}.s".format(lines)), lines, seed)
+			project = os.path.join(scratch, "project{}".format(lines))
+			os.makedirs(project, exist_ok = True)
+			for k in range(PROJECT_FILES):
+				generate(os.path.join(project, "f{}.s".format(k)), lines // PROJECT_FILES, seed + k)
+
+			for name, fn in cases().items():
+				if only is not None and name not in only:
+					continue
+				seconds, peak = _measure(fn, path, project, repeat)
+				results.append({
+					"case": name,
+					"lines": lines,
+					"seconds": seconds,
+					"lines_per_sec": lines / seconds if seconds > 0 else None,
+					"peak_bytes": peak
+				})
+				print("{:<22} {:>9} lines {:>10.4f}s {:>12.0f} lines/s {:>12} peak".format(
+					name, lines, seconds, results[-1]["lines_per_sec"] or 0, peak
+				), file = sys.stderr)
+	finally:
+		os.chdir(cwd)
+		shutil.rmtree(scratch, ignore_errors = True)
+
+	return {
+		"version": _version(),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"seed": seed,
+		"results": results
+	}
+
+#lines/sec of new relative to old for every case both of them ran
+def compare(old, new):
+	base = dict(((r["case"], r["lines"]), r) for r in old["results"])
+	rows = []
+	for r in new["results"]:
+		o = base.get((r["case"], r["lines"]))
+		if o is None or not o["lines_per_sec"] or not r["lines_per_sec"]:
+			continue
+		rows.append((r["case"], r["lines"], r["lines_per_sec"] / o["lines_per_sec"], r["peak_bytes"] / max(o["peak_bytes"], 1)))
+	return rows
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Benchmark riscv_assembler on synthetic programs")
+	parser.add_argument("--lines", type = int, nargs = "+", default = [10000])
+	parser.add_argument("--seed", type = int, default = 0)
+	parser.add_argument("--repeat", type = int, default = 3)
+	parser.add_argument("--case", action = "append", dest = "only", help = "only run these cases")
+	parser.add_argument("--out", help = "write the results as json here")
+	parser.add_argument("--compare", help = "json results of an earlier run")
+	args = parser.parse_args(argv)
+
+	results = run(args.lines, args.seed, args.repeat, args.only)
+	if args.out:
+		with open(args.out, "w") as f:
+			json.dump(results, f, indent = 1)
+	else:
+		json.dump(results, sys.stdout, indent = 1)
+		print()
+
+	if args.compare:
+		with open(args.compare) as f:
+			old = json.load(f)
+		for case, lines, speed, mem in compare(old, results):
+			print("{:<22} {:>9} lines  x{:.2f} throughput  x{:.2f} peak memory".format(case, lines, speed, mem), file = sys.stderr)
+
+if __name__ == "__main__":
+	main()
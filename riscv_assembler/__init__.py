@@ -1,3 +1,19 @@
-import riscv_assembler
-__all__ = ['riscv_assembler',"AssemblyConverter","R_type","I_type","S_type","SB_type", "U_type", "UJ_type", "instructionExists", "getOutputType", "setOutputType", "convert_ret", "convert"]
-__author__ = "Kaya Çelebi"
\ No newline at end of file
+import sys
+
+__all__ = ["AssemblyConverter", "ProjectConverter"]
+__author__ = "Kaya Çelebi"
+
+#the converters are imported on first use, so importing the package is free.
+#Module __getattr__ only exists from python 3.7 on, older ones import them now
+if sys.version_info < (3, 7):
+	from .convert import AssemblyConverter
+	from .project_convert import ProjectConverter
+
+def __getattr__(name):
+	if name == "AssemblyConverter":
+		from .convert import AssemblyConverter
+		return AssemblyConverter
+	if name == "ProjectConverter":
+		from .project_convert import ProjectConverter
+		return ProjectConverter
+	raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
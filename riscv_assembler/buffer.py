@@ -0,0 +1,102 @@
+from array import array
+from collections.abc import Sequence
+
+from .encoding import WORD_BITS, WORD_BYTES, to_bin, to_hex, nibbleForm, pack_words, render, render_text
+
+__all__ = ['InstructionBuffer']
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#encoded words kept as one array of 64 bit ints (8 bytes a word instead of a
+#~100 byte str each). Indexing and iterating render the words the way the
+#converter was asked to (bit string, hex or nibbles), so it can stand in for
+#the list of strings convert_ret used to return
+class InstructionBuffer(Sequence):
+
+	def __init__(self, words = (), width = WORD_BITS, hexMode = False, nibble = False):
+		if isinstance(words, array) and words.typecode == 'Q':
+			self.words = words
+		else:
+			self.words = array('Q', words)
+		#bits shown by the text views, convert() pads up to 64
+		self.width = width
+		self.hexMode = hexMode
+		self.nibble = nibble
+
+	def __str__(self):
+		return "InstructionBuffer(len={}, width={}, hexmode={}, nibble={})".format(
+			len(self.words), self.width,
+			self.hexMode, self.nibble
+		)
+
+	def __repr__(self):
+		return repr(self.as_text())
+
+	def __len__(self):
+		return len(self.words)
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return self.__render(self.words[i])
+		return self.__render_one(self.words[i])
+
+	def __iter__(self):
+		render_one = self.__render_one
+		for w in self.words:
+			yield render_one(w)
+
+	#equal to another buffer with the same words/view, or to the list of
+	#strings it renders to
+	def __eq__(self, other):
+		if isinstance(other, InstructionBuffer):
+			return (self.words == other.words and self.width == other.width
+				and self.hexMode == other.hexMode and self.nibble == other.nibble)
+		if isinstance(other, (list, tuple)):
+			return len(other) == len(self.words) and self.as_text() == list(other)
+		return NotImplemented
+
+	def __render_one(self, w):
+		if self.hexMode:
+			return to_hex(w)
+		if self.nibble:
+			return nibbleForm(to_bin(w, self.width))
+		return to_bin(w, self.width)
+
+	def __render(self, words):
+		return render(words, self.width, self.hexMode, self.nibble)
+
+	def append(self, word):
+		self.words.append(word)
+
+	def extend(self, words):
+		self.words.extend(words)
+
+	#views
+	def as_ints(self):
+		return self.words
+
+	def as_bin(self):
+		return render(self.words, self.width)
+
+	def as_hex(self):
+		return render(self.words, self.width, hexMode = True)
+
+	def as_nibbles(self, delim = '\t'):
+		return render(self.words, self.width, nibble = True, delim = delim)
+
+	#the view selected by hexMode/nibble
+	def as_text(self):
+		return self.__render(self.words)
+
+	#the same as one string, a word per line, rendered in a single batch
+	def joined(self):
+		return render_text(self.words, self.width, self.hexMode, self.nibble)
+
+	def tobytes(self, word_bytes = WORD_BYTES, byteorder = 'little'):
+		return pack_words(self.words, word_bytes, byteorder)
+
+	#bytes held by the words themselves
+	def nbytes(self):
+		return self.words.itemsize*len(self.words)
@@ -0,0 +1,78 @@
+from array import array
+import hashlib
+import os
+import sys
+
+from .tables import load_tables
+
+__all__ = ['BuildCache']
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#on disk cache of encoded words, one file per key. The key covers the
+#source bytes, the converter options and the instruction tables, so an
+#entry can only be reused for a build that would produce the same words
+class BuildCache:
+
+	def __init__(self, path):
+		self.path = path
+		os.makedirs(self.path, exist_ok = True)
+		self.hits = 0
+		self.misses = 0
+
+	def __str__(self):
+		return "BuildCache(path={}, hits={}, misses={})".format(
+			self.path, self.hits, self.misses
+		)
+
+	def key(self, source, options):
+		h = hashlib.sha256()
+		h.update(load_tables().digest.encode())
+		h.update(repr(sorted(options.items())).encode())
+		h.update(source)
+		return h.hexdigest()
+
+	def __entry(self, key):
+		return os.path.join(self.path, key + ".words")
+
+	#cached words for key, None (and a miss) if the file is dirty
+	def get(self, key):
+		try:
+			with open(self.__entry(key), "rb") as f:
+				data = f.read()
+		except OSError:
+			self.misses += 1
+			return None
+
+		words = array('Q')
+		words.frombytes(data)
+		if sys.byteorder != 'little':
+			words.byteswap()
+		self.hits += 1
+		return words
+
+	#stored little endian, written to a temp file first so a crashed
+	#build never leaves a half written entry behind
+	def put(self, key, words):
+		words = array('Q', words)
+		if sys.byteorder != 'little':
+			words.byteswap()
+		tmp = self.__entry(key) + ".tmp"
+		with open(tmp, "wb") as f:
+			f.write(words.tobytes())
+		os.replace(tmp, self.__entry(key))
+
+	def stats(self):
+		return {"hits": self.hits, "misses": self.misses}
+
+	def resetStats(self):
+		self.hits = 0
+		self.misses = 0
+
+	#drop every entry
+	def clear(self):
+		for x in os.listdir(self.path):
+			if x.endswith(".words"):
+				os.remove(os.path.join(self.path, x))
@@ -1,9 +1,23 @@
-from bitstring import BitArray
-import math as m
-from pathlib import Path
 import os
+from functools import lru_cache
+
+from .encoding import *
+from .layout import layout, line_size, parse_line, symbol_table
+from .buffer import InstructionBuffer
+from array import array
+from collections import deque
+from .tables import RegisterMap, load_tables
+from .instrument import counted, stage
+from .link import Relocatable, exports_of
+from . import logs
+from .pseudo import PSEUDO, expand
+from .producers import ProducerMap, ProducerError, too_far
+
+__all__ = ['AssemblyConverter', 'UnknownLabel']
+
+#silent unless the application configures logging, see AssemblyConverter(verbose=True)
+log = logs.getLogger(__name__)
 
-__all__ = ['AssemblyConverter']
 class WrongInstructionSize( Exception ):
 	#raised when instruction size is not 32 bits
 	def __init__(self, message = "Instruction is not 32 bits, possible assembly file error"):
@@ -31,22 +45,31 @@ class EmptyFile( Exception ):
 		self.message = message
 		super().__init__(self.message)
 
+class UnknownLabel( ValueError ):
+	def __init__(self, message = "Branch target is neither a label in this file nor a number"):
+		self.message = message
+		super().__init__(self.message)
+
 class WrongInstructionType( Exception ):
 	def __init__(self, message = "This instruction does not fit this instruction type"):
 		self.message = message
 		super().__init__(self.message)
 
-class RegisterMap(dict):
-   def __init__(self,*arg,**kw):
-      super(RegisterMap, self).__init__(*arg, **kw)
+class WrongOperandCount( ValueError ):
+	#raised with the tokens of a line that has operands its format doesn't take (or misses some)
+	def __init__(self, tokens = None, message = "Wrong number of operands for this instruction"):
+		if tokens is not None:
+			message = "{}: {}".format(message, " ".join(tokens))
+		self.message = message
+		super().__init__(self.message)
+
+#I type mnemonics that take an offset(base) memory operand
+LOADS = ("lb", "lw", "ld", "lbu", "lhu", "lwu")
 
-   def __getitem__(self, elem):
-	   if elem[0] == '[' and elem[-1] == ']':
-		   dest_num = int(elem[1:-1])
-		   assert dest_num <= 2**23, "source operand distance too large"
-		   return dest_num
-	   else:
-		   return super().get(elem)
+#lines kept by the encode cache of every converter, see setCacheSize. Off by
+#default, a hit saves little more than a miss costs, so it only pays off on
+#sources made of the same few lines over and over
+CACHE_SIZE = 0
 
 #-----------------------------------------------------------------------------------------		
 #-----------------------------------------------------------------------------------------
@@ -63,10 +86,7 @@ def flatten(x):
 	return arr
 
 def nibbleForm(x):
-	fin_str = ""
-	for i in range(0,len(x),4):
-		fin_str += (x[i:i+4] + "\t")
-	return fin_str[:-1]
+	return "\t".join([x[i:i+4] for i in range(0,len(x),4)])
 
 
 
@@ -124,10 +144,39 @@ class AssemblyConverter:
 		pseudo_instr
 	])
 
-	def __init__(self, output_type='b', nibble = False, filename = "", hexMode = False):	
+	#mnemonic -> format, one dict lookup instead of scanning the lists above
+	formats = dict(
+		[(x, "R") for x in R_instr] + [(x, "I") for x in I_instr] +
+		[(x, "S") for x in S_instr] + [(x, "SB") for x in SB_instr] +
+		[(x, "U") for x in U_instr] + [(x, "UJ") for x in UJ_instr] +
+		[(x, "pseudo") for x in pseudo_instr]
+	)
+
+	def __init__(self, output_type='b', nibble = False, filename = "", hexMode = False, verbose = False,
+			word_bytes = WORD_BYTES, byteorder = 'little', use_mmap = False, stats = None,
+			cache_size = CACHE_SIZE, sink = None, packed = None):	
 		self.code = []
-		self.instructions = []
+		self.line_addr = []
+		self.symbols = {}
+		#encoded words as an array of ints, instructions is the InstructionBuffer
+		#handed back to the caller, rendering them on demand
+		self.words = array('Q')
+		self.instructions = InstructionBuffer()
 		self.hexMode = hexMode
+		#per line debug trace, off by default so the hot path does no formatting
+		self.verbose = verbose
+		#.bin layout, bytes per word, byte order and whether to write through mmap
+		self.word_bytes = word_bytes
+		self.byteorder = byteorder
+		self.use_mmap = use_mmap
+		#bits per word of a packed bitstream .bin (encoding.pack_stream), None for word_bytes padded words
+		self.packed = packed
+		#instrument.Stats collecting stage times and counters, None turns it off
+		self.stats = stats
+		#sinks.Sink the "b"/"t" outputs go to, None writes them under the current directory
+		self.sink = sink
+		#targets left for the linker, only a list while relocatable() runs
+		self.__unresolved = None
 
 		if "b" not in output_type and "t" not in output_type and "p" not in output_type and "r" not in output_type:
 			raise IncorrectOutputType()
@@ -142,60 +191,55 @@ class AssemblyConverter:
 		#print(len(self.code))
 		self.nibble = nibble
 		#get instruction data and register mapping
-		self.r_map, self.instr_data = self.__pre()
-
-	def __str__():
-		return "AssemblyConverter(output_type={}, nibble={}, filename={}, hexmode={})".format(
+		tables = self.__pre()
+		self.r_map, self.instr_data, self.instr_fields = tables.r_map, tables.instr_data, tables.instr_fields
+		self.operands = tables.operands
+		self.dispatch = self.__dispatch_table()
+		self.cacheable = self.__cacheable()
+		self.__encode_cache = None
+		self.setCacheSize(cache_size)
+
+	def __str__(self):
+		return "AssemblyConverter(output_type={}, nibble={}, filename={}, hexmode={}, verbose={})".format(
 			self.output_type, self.nibble,
-			self.filename, self.hexMode
+			self.filename, self.hexMode,
+			self.verbose
 		)
 
 
 	#helper methods
+	#operand token to register number, a [N] past the 10 bit field raises
+	#ProducerError, which the callers collect into one report per file
 	def __reg_map(self,x):
-		return self.r_map[x]
-
-	def __reg_to_bin(self,x):
-		if type(x) == str:
-			x = int(x[1::])
-		return self.__binary(x, 10)
+		try:
+			return self.operands[x]
+		except KeyError:
+			if x[0] == "%":
+				#only left over when the file defines no producer at all
+				raise ProducerError([(None, x, "has no producer above it")])
+			if x[0] == "[" and x[-1] == "]" and x[1:-1].isdigit():
+				#operands holds every distance the 10 bit field can take
+				raise ProducerError([(None, x, too_far())])
+			return reg_num(self.r_map[x])
 
 	#for jumps, calculates hex address of func
 	def calcJump(self, x,line_num):
-		#calc line number of func
-		for i in range(len(self.code)):
-			if x+":" == self.code[i]:
-				return (i - line_num)*4 #how many instructions to jump ahead/behind
-		#print("Address not found")
-		return -10 #if not found
-
-	def __binary(self, x, size):
-		byte_num = m.ceil(size/8)
-		b_num = x.to_bytes(byte_num, byteorder = 'big', signed = True)
-
-		fin_bin = ''.join(format(byte, '08b') for byte in b_num)
-		
-		if byte_num*8 == size:
-			return fin_bin
-		return fin_bin[len(fin_bin)-size:len(fin_bin)]
-
-	#checks if line is comment, empty space, or .global .text
-	def __valid_line(self, x, allow_colon = False):
-		if x[0][0] == "#" or x[0][0] == "\n" or x[0][0] == "" or x[0][0] == ".":
-			return False
-
-		if not allow_colon and x[0][-1] == ":" :
-			return False
-		return True
-
-	#gets rid of inline comments
-	def __handle_inline_comments(self,x):
-		if "#" in x:
-			pos = x.index("#")
-			if pos != 0 and pos != len(x)-1:
-				return x[0:pos]
-
-		return x
+		if x not in self.symbols:
+			return -10 #if not found
+		return self.symbols[x] - self.line_addr[line_num] #how many bytes to jump ahead/behind
+
+	#branch/jump operand of the instruction at pc, either a label or a literal offset
+	def __target(self, x, pc):
+		if x in self.symbols:
+			return self.symbols[x] - pc
+		try:
+			return int(x)
+		except ValueError:
+			if self.__unresolved is not None:
+				#relocatable(), the linker fills it in
+				self.__unresolved.append((x, pc))
+				return 0
+			raise UnknownLabel("Unknown label: " + x)
 
 	#change output type
 	def setOutputType(self, x):
@@ -207,7 +251,7 @@ class AssemblyConverter:
 
 	#checks whether instruction is in system
 	def instructionExists(self,x):
-		return x in self.all_instr
+		return x in self.formats
 
 	#convert instructions from binary to hex
 	def hex(self,x,leading_zero=True):
@@ -221,6 +265,68 @@ class AssemblyConverter:
 	def setHex(self, x):
 		self.hexMode = x
 
+	#turn the per line debug trace on/off
+	def setVerbose(self, x):
+		self.verbose = x
+
+	#attach an instrument.Stats, None to stop collecting
+	def setStats(self, x):
+		self.stats = x
+
+	def getStats(self):
+		return self.stats
+
+	#send the "b"/"t" outputs to a sinks.Sink, None for files under the current directory
+	def setSink(self, x):
+		self.sink = x
+
+	def getSink(self):
+		return self.sink
+
+	#.bin layout: bytes per word and their byte order, or the bits per word
+	#of a packed bitstream (None for padded words)
+	def setWordBytes(self, x):
+		self.word_bytes = x
+
+	def getWordBytes(self):
+		return self.word_bytes
+
+	def setByteorder(self, x):
+		self.byteorder = x
+
+	def getByteorder(self):
+		return self.byteorder
+
+	def setPacked(self, x):
+		self.packed = x
+
+	def getPacked(self):
+		return self.packed
+
+	#bound of the encode cache in lines, None for unbounded and 0 to turn
+	#it off. Starts over with an empty cache
+	def setCacheSize(self, x):
+		self.cache_size = x
+		self.__encode_cache = None
+		if x != 0:
+			self.__encode_cache = lru_cache(maxsize = x)(self.__encode_fixed)
+
+	#hits, misses, entries, bound and hit rate of the encode cache
+	def cacheInfo(self):
+		if self.__encode_cache is None:
+			return {"hits": 0, "misses": 0, "size": 0, "maxsize": 0, "hit_rate": 0.0}
+		info = self.__encode_cache.cache_info()
+		total = info.hits + info.misses
+		return {
+			"hits": info.hits, "misses": info.misses,
+			"size": info.currsize, "maxsize": info.maxsize,
+			"hit_rate": info.hits/total if total > 0 else 0.0
+		}
+
+	def clearCache(self):
+		if self.__encode_cache is not None:
+			self.__encode_cache.cache_clear()
+
 	#add custom pseudo instruction
 	#to be implemented later
 	'''
@@ -228,510 +334,521 @@ class AssemblyConverter:
 		return ""
 	'''
 	
-	#create instruction
+	#create instruction, returns the bit string of the encoded word
 	def R_type(
 			self, instr, rs1, 
 			rs2):
-		print("instr: ", instr)
-		if instr not in self.R_instr:
-			raise WrongInstructionType()
-
-		opcode = 0;f3 = 1;f7 = 2
-		print(rs2, rs1)
-		print(self.__reg_to_bin(rs2)[0:5],
-			self.__reg_to_bin(rs1)[0:5],
-			self.instr_data[instr][f7],
-			self.__reg_to_bin(rs2)[-5:10],
-			self.__reg_to_bin(rs1)[-5:10],
-			self.instr_data[instr][f3],
-			5*"0", # self.__reg_to_bin("x0"),
-			self.instr_data[instr][opcode])
-
-		return "".join([
-			self.__reg_to_bin(rs2)[0:5],
-			self.__reg_to_bin(rs1)[0:5],
-			self.instr_data[instr][f7],
-			self.__reg_to_bin(rs2)[-5:10],
-			self.__reg_to_bin(rs1)[-5:10],
-			self.instr_data[instr][f3],
-			5*"0", # self.__reg_to_bin("x0"),
-			self.instr_data[instr][opcode]
-		])
+		return to_bin(self.__R_word(instr, reg_num(rs1), reg_num(rs2)))
 
 	def I_type(
 			self, instr, rs1, 
 			imm):
-		print("instr: ", instr)
-		if instr not in self.I_instr:
-			raise WrongInstructionType()
-		opcode = 0;f3 = 1;f7 = 2
-		mod_imm = int(imm) - ((int(imm)>>12)<<12) # imm[11:0]
-		print(rs1)
-		print(			'00000',
-			self.__reg_to_bin(rs1)[0:5],
-			self.__binary(mod_imm,12),
-			self.__reg_to_bin(rs1)[-5:10],
-			self.instr_data[instr][f3],
-			5*"0", # self.__reg_to_bin("x0"),
-			self.instr_data[instr][opcode])
-		return "".join([
-			#self.__binary(int(imm),12),
-			'00000',
-			self.__reg_to_bin(rs1)[0:5],
-			self.__binary(mod_imm,12),
-			self.__reg_to_bin(rs1)[-5:10],
-			self.instr_data[instr][f3],
-			5*"0", # self.__reg_to_bin("x0"),
-			self.instr_data[instr][opcode]
-		])
+		return to_bin(self.__I_word(instr, reg_num(rs1), imm))
 
 	def S_type(
 			self, instr, rs1, 
 			rs2, imm):
-		print("instr: ", instr)
-		if instr not in self.S_instr:
-			raise WrongInstructionType()
-
-		opcode = 0;f3 = 1;f7 = 2
-		mod_imm = (int(imm) - ((int(imm) >> 12) << 12)) >> 5 # imm[11:5]
-		mod_imm_2 = int(imm) - ((int(imm) >> 5) << 5) # imm[4:0]
-	
-
-		print(rs2, rs1)
-		print(			#self.__binary(int(imm),12)[::-1][5:12][::-1],
-			self.__reg_to_bin(rs2)[0:5],
-			self.__reg_to_bin(rs1)[0:5],
-			self.__binary(mod_imm, 7), # imm[11:5]
-			self.__reg_to_bin(rs2)[-5:10],
-			self.__reg_to_bin(rs1)[-5:10],
-			self.instr_data[instr][f3],
-			#self.__binary(int(imm),12)[::-1][0:5][::-1],
-			self.__binary(mod_imm_2, 5), # imm[4:0]
-			self.instr_data[instr][opcode]
-			)
-		return "".join([
-			#self.__binary(int(imm),12)[::-1][5:12][::-1],
-			self.__reg_to_bin(rs2)[0:5],
-			self.__reg_to_bin(rs1)[0:5],
-			self.__binary(mod_imm, 7), # imm[11:5]
-			self.__reg_to_bin(rs2)[-5:10],
-			self.__reg_to_bin(rs1)[-5:10],
-			self.instr_data[instr][f3],
-			#self.__binary(int(imm),12)[::-1][0:5][::-1],
-			self.__binary(mod_imm_2, 5), # imm[4:0]
-			self.instr_data[instr][opcode]
-		])
+		return to_bin(self.__S_word(instr, reg_num(rs1), reg_num(rs2), imm))
 
 	def SB_type(
 			self, instr, rs1, 
 			rs2, imm):
-		print("instr: ", instr)
-		if instr not in self.SB_instr:
-			raise WrongInstructionType()
-
-		opcode = 0;f3 = 1;f7 = 2
-
-		# mod_imm = (int(imm) - ((int(imm) >> 12) << 12)) >> 6 # imm[12]
-		# mod_imm += (int(imm) - ((int(imm) >> 11) >> 11)) >> 5 # imm[12|10:5]
-		# mod_imm_2 = (int(imm) - ((int(imm) >> 5) << 5)) # imm[4:1]
-		# mod_imm_2 += (int(imm) - ((int(imm) >> 11) << 11)) >> 10 # imm[4:1|11]
-
-		mod_imm = (int(imm) >> 11 & 0x1) << 6
-		mod_imm += (int(imm) >> 4 & 0x3F) << 0
-		mod_imm_2 = (int(imm) >> 0 & 0xF) << 1
-		mod_imm_2 += (int(imm) >> 10 & 0x1) << 0
-
-		print(rs2, rs1)
-		print(			self.__reg_to_bin(rs2)[0:5],
-			self.__reg_to_bin(rs1)[0:5],
-			self.__binary(mod_imm,7),
-			self.__reg_to_bin(rs2)[-5:10],
-			self.__reg_to_bin(rs1)[-5:10],
-			self.instr_data[instr][f3],
-			self.__binary(mod_imm_2,5),
-			#"".join([
-			#	self.__binary(int(imm),13)[::-1][1:5][::-1],
-			#	self.__binary(int(imm),13)[::-1][11][::-1]
-			#]),
-			self.instr_data[instr][opcode])
-
-		return "".join([
-			#"".join([
-			#	self.__binary(int(imm),13)[::-1][12][::-1],
-			#	self.__binary(int(imm),13)[::-1][5:11][::-1]
-			#]),
-			self.__reg_to_bin(rs2)[0:5],
-			self.__reg_to_bin(rs1)[0:5],
-			self.__binary(mod_imm,7),
-			self.__reg_to_bin(rs2)[-5:10],
-			self.__reg_to_bin(rs1)[-5:10],
-			self.instr_data[instr][f3],
-			self.__binary(mod_imm_2,5),
-			#"".join([
-			#	self.__binary(int(imm),13)[::-1][1:5][::-1],
-			#	self.__binary(int(imm),13)[::-1][11][::-1]
-			#]),
-			self.instr_data[instr][opcode]
-		])
-
+		return to_bin(self.__SB_word(instr, reg_num(rs1), reg_num(rs2), imm))
 
 	def U_type(
 			self, instr, 
 			imm):
-		print("instr: ", instr)
-		if instr not in self.U_instr:
-			raise WrongInstructionType()
-		opcode = 0;f3 = 1;f7 = 2
-
-		mod_imm = (int(imm))
-		print(			'00000',
-			'00000',
-			#self.__binary(int(imm),32)[::-1][12:32][::-1],
-			self.__binary(mod_imm,20),
-			5*"0", # self.__reg_to_bin("x0"),
-			self.instr_data[instr][opcode])
-		return "".join([
-			'00000',
-			'00000',
-			#self.__binary(int(imm),32)[::-1][12:32][::-1],
-			self.__binary(mod_imm,20),
-			5*"0", # self.__reg_to_bin("x0"),
-			self.instr_data[instr][opcode]
-		])
+		return to_bin(self.__U_word(instr, imm))
 
 	def UJ_type(
 			self, instr, 
 			imm):
-		print("instr: ", instr)
-		if instr not in self.UJ_instr:
+		return to_bin(self.__UJ_word(instr, imm))
+
+	#integer encoders, every instruction is built as an int and only
+	#rendered to text/hex/nibbles once it leaves the converter.
+	#rs1/rs2 are register numbers as returned by __reg_map
+	def __R_word(self, instr, rs1, rs2):
+		if self.formats.get(instr) != "R":
+			raise WrongInstructionType()
+
+		opcode, f3, f7 = self.instr_fields[instr]
+		return pack_R(opcode, f3, f7, rs1, rs2)
+
+	def __I_word(self, instr, rs1, imm):
+		if self.formats.get(instr) != "I":
+			raise WrongInstructionType()
+
+		opcode, f3, f7 = self.instr_fields[instr]
+		return pack_I(opcode, f3, rs1, int(imm))
+
+	def __S_word(self, instr, rs1, rs2, imm):
+		if self.formats.get(instr) != "S":
 			raise WrongInstructionType()
 
-		opcode = 0;f3 = 1;f7 = 2
-		# mod_imm = ((int(imm) - ((int(imm) >> 20) << 20)) >> 19) << 19 # imm[20]
-		# mod_imm += (int(imm) - ((int(imm) >> 10) << 10)) >> 1 # imm[20|10:1]
-		# mod_imm += (int(imm) - ((int(imm) >> 11) << 11)) >> 10 # imm[20|10:1|11]
-		# mod_imm += (int(imm) - ((int(imm) >> 19) << 19)) >> 12 # imm[20|10:1|11|19:12]
-
-		mod_imm = (int(imm) >> 19 & 0x1) << 19
-		mod_imm += (int(imm) >> 0 & 0x3FF) << 9
-		mod_imm += (int(imm) >> 10 & 0x1) << 8
-		mod_imm += (int(imm) >> 11 & 0xFF) << 0
-		print("new mod_imm: ", hex(mod_imm))
-
-		print(			'00000',
-			'00000',	
-			self.__binary(mod_imm,20),
-			5*"0", # self.__reg_to_bin("x0"),
-			self.instr_data[instr][opcode])
-		# mod_imm = (int(imm) >> 20) << 20
-		# mod_imm += ((int(imm) - ((int(imm) >> 11) << 11)) >> 1) << 10
-		return  "".join([
-			#"".join([
-			#	self.__binary(int(imm),21)[::-1][20][::-1], self.__binary(int(imm),21)[::-1][1:11][::-1],
-			#	self.__binary(int(imm),21)[::-1][11][::-1],
-			#	self.__binary(int(imm),21)[::-1][12:20][::-1]
-			#]),	
-			'00000',
-			'00000',	
-			self.__binary(mod_imm,20),
-			5*"0", # self.__reg_to_bin("x0"),
-			self.instr_data[instr][opcode]
-		])
+		opcode, f3, f7 = self.instr_fields[instr]
+		return pack_S(opcode, f3, rs1, rs2, int(imm))
+
+	def __SB_word(self, instr, rs1, rs2, imm):
+		if self.formats.get(instr) != "SB":
+			raise WrongInstructionType()
+
+		opcode, f3, f7 = self.instr_fields[instr]
+		return pack_SB(opcode, f3, rs1, rs2, int(imm))
+
+	def __U_word(self, instr, imm):
+		if self.formats.get(instr) != "U":
+			raise WrongInstructionType()
+
+		return pack_U(self.instr_fields[instr][0], int(imm))
+
+	def __UJ_word(self, instr, imm):
+		if self.formats.get(instr) != "UJ":
+			raise WrongInstructionType()
+
+		return pack_UJ(self.instr_fields[instr][0], int(imm))
 
 
 	##Procedural functions
 
-	#initializing mapping and instruction data
+	#initializing mapping and instruction data, shared by every converter in the process
 	def __pre(self):
-		#register mapping
-		#make dictionary
-		rmap_path = Path(__file__).parent / "data/reg_map.dat"	
-		# r_p = {}
-		r_p = RegisterMap()
-		
-		f = open(rmap_path,"r")
-		#f = open("riscinterpreter/data/reg_map.dat", "r")
-		#f = open("src/data/reg_map.dat","r")
-		line = f.readline()
-
-		#assign mapping 
-		while line != "":
-			elems = line.split(" ")
-			r_p[elems[0]] = elems[1] 
-			line = f.readline()
-
-		f.close()
-		#index for instr_data
-		opcode = 0
-		f3 = 1
-		f7 = 2
-
-		#order is [opcode, f3, f7]
-		i_data = {}
-		instr_path = Path(__file__).parent / "data/instr_data.dat"
-		f = open(instr_path,"r")
-		#f = open("riscinterpreter/data/instr_data.dat", "r")
-		#f = open("src/data/instr_data.dat","r")
-		line = f.readline()
-
-		#assign data
-		while line != "":
-			elems = line.replace("\n","").split(" ")
-			i_data[elems[0]] = elems[1::]
-			line = f.readline()
-		f.close()
-
-		return r_p,i_data
+		return load_tables()
 
 	#READ FILE IN ADVANCE
+	#also lays out the code: byte address of every line and the label table
 	def __read_in_advance(self):
-		code = []
-		file = open(self.filename, "r")
-
-		#store the lines in the arr
-		line = file.readline()
-		while line != "":
-			line = line.strip()
-			clean = flatten([elem.replace("\n","").split(",") for elem in line.split(" ")])
-			if line == "" or not self.__valid_line(clean, True):
-				line = file.readline()
-				continue
-			code.append(line.strip())
-			line = file.readline()
-
+		with open(self.filename, "r") as file:
+			return self.__read(file)
+
+	#lay out an iterable of source lines, from a file or held in memory
+	def __read(self, lines):
+		if self.stats is None:
+			code, self.line_addr, self.symbols = layout(lines, self.formats)
+			return code
+
+		read = self.stats.counters.get("lines_read", 0)
+		code, self.line_addr, self.symbols = layout(counted(self.stats, "lines_read", lines), self.formats)
+		#comments, blank lines, labels and directives
+		read = self.stats.counters["lines_read"] - read
+		self.stats.count("lines_code", len(code))
+		self.stats.count("lines_skipped", read - len(code))
 		return code
 
 	#retrieve instructions
 	def __get_instructions(self):
 		#array to store instructions in
-		instructions = [] 
-		for i in range(len(self.code)):
-			line = self.code[i]
-
-			response = self.__interpret(line,i)
-			if -1 not in response:
-				instructions.extend(response)
+		instructions = array('Q')
+		problems = []
+		for line, (clean, pc) in enumerate(zip(self.code, self.line_addr)):
+			try:
+				instructions.extend(self.__interpret(clean, pc))
+			except ProducerError as e:
+				#operands out of reach are reported for the whole file at once
+				problems.extend((line, x, reason) for _, x, reason in e.problems)
+		if len(problems) > 0:
+			raise ProducerError(problems)
 
 		return instructions
 
-	#interpret each line and form instructions
-	def __interpret(self,line,i):
-		res = []
-		line = self.__handle_inline_comments(line)
-		line = line.strip()
-		#print(line)
-		clean = flatten([elem.replace("\n","").split(",") for elem in line.split(" ")])
-
-		while "" in clean:
-			clean.remove("")
-
-		#check if line is comment, empty space, .global .text
-		if not self.__valid_line(clean):
-			return [-1]
-
+	#form the instructions of one line, clean are its tokens as laid out by
+	#layout.parse_line (comments and labels gone, memory operands like
+	#0(sp) already split into 0 sp), pc is the line's byte address
+	def __interpret(self,clean,pc):
 		# if clean[0] == "ecall":
 		# 	return [-1]
 
-		# STACEY: not sure seems not needed
-		# if clean[0] == "sw" or clean[0] == "lw" or clean[0] == "lb" or clean[0] == "lh" or clean[0] == "sb" or clean[0] == "sh":
-		# 	#sw s0, 0(sp)
-		# 	w_spl = clean[2].split("(")
-		# 	clean[2] = w_spl[0]
-		# 	clean.append(w_spl[1].replace(")",""))
-
-		if clean[0] in self.R_instr:
-			res.append(self.R_type(clean[0], self.__reg_map(clean[1]), self.__reg_map(clean[2])))
-			# print(res)
-		elif clean[0] in self.I_instr:
-			if clean[0] == "jalr":
-				if len(clean) == 3:
-					# res.append(self.I_type(clean[0], self.__reg_map(clean[1]), self.calcJump(clean[2],i)))
-					res.append(self.I_type(clean[0], self.__reg_map(clean[1]), int(clean[2])))
-				else:
-					res.append(self.I_type(clean[0], self.__reg_map(clean[1]), "0"))
-			elif clean[0] == "lw":
-				res.append(self.I_type(clean[0], self.__reg_map(clean[1]), clean[2]))
-			elif clean[0] == "ecall":
-				res.append(self.I_type(clean[0], self.__reg_map("x0"),"0"))
-			else:
-				res.append(self.I_type(clean[0], self.__reg_map(clean[1]), clean[2]))
-			# print(res)
-		elif clean[0] in self.S_instr:
-			res.append(self.S_type(clean[0], self.__reg_map(clean[1]), self.__reg_map(clean[2]), int(clean[3])))
-			# print(res)
-		elif clean[0] in self.SB_instr:
-			# res.append(self.SB_type(clean[0], self.__reg_map(clean[1]), self.__reg_map(clean[2]), self.calcJump(clean[3],i)))
-			res.append(self.SB_type(clean[0], self.__reg_map(clean[1]), self.__reg_map(clean[2]), int(clean[3])))
-			# print(res)
-		elif clean[0] in self.U_instr:
-			res.append(self.U_type(clean[0], clean[1]))
-			# print(res)
-		elif clean[0] in self.UJ_instr:
-			if len(clean) == 3:
-				# res.append(self.UJ_type(clean[0], self.calcJump(clean[2],i)))
-				res.append(self.UJ_type(clean[0], int(clean[2])))
-			else:
-				res.append(self.UJ_type(clean[0], int(clean[1])))
-				# res.append(self.UJ_type(clean[0], self.calcJump(clean[1],i)))
-			# print(res)
-		elif clean[0] in self.pseudo_instr:
-			# print(clean[0]  + " pseudo")
-
-			if clean[0] == "li": #need to consider larger than 12 bits
-				#res = self.I_type("addi",self.__reg_map(clean[1]), self.calcJump(clean[2],i), self.__reg_map(clean[1]))
-				if int(clean[2]) > 2**11:
-					res.append(self.U_type(instr='lui', imm=clean[2]))
-				res.append(self.I_type("addi", clean[2]))
-			elif clean[0] == "nop":
-				res.append(self.I_type("addi", self.__reg_map("x0"), "0"))
-			elif clean[0] == "mv":
-				res.append(self.I_type("addi", self.__reg_map(clean[1]), "0"))
-			elif clean[0] == "not":
-				res.append(self.I_type("xori", self.__reg_map(clean[1]), "-1"))
-			elif clean[0] == "neg":
-				res.append(self.R_type("sub", self.__reg_map("x0"), self.__reg_map(clean[1])))
-			elif clean[0] == "la":
-				# res.append(self.U_type("auipc", self.calcJump(clean[1],i)))
-				res.append(self.U_type("auipc", int(clean[1])))
-			elif clean[0] == "j":
-				# res.append(self.UJ_type("jal", self.calcJump(clean[1],i)))
-				res.append(self.UJ_type("jal", int(clean[1])))
-			elif clean[0] == "jr":
-				res.append(self.I_type("jalr", self.__reg_map(clean[1]), "0"))
-			elif clean[0] == "ret":
-				res.append(self.I_type("jalr", self.__reg_map("x1"), "0"))
-			elif clean[0] == "bgt":
-				# res.append(self.SB_type("blt", self.__reg_map(clean[2]), self.__reg_map(clean[1]), self.calcJump(clean[3],i)))
-				res.append(self.SB_type("blt", self.__reg_map(clean[2]), self.__reg_map(clean[1]), int(clean[3])))
-			elif clean[0] == "ble":
-				# res.append(self.SB_type("bge", self.__reg_map(clean[2]), self.__reg_map(clean[1]), self.calcJump(clean[3], i)))
-				res.append(self.SB_type("bge", self.__reg_map(clean[2]), self.__reg_map(clean[1]), int(clean[3])))
-			# print(res)
+		#one lookup decides format, encoder and operand layout
+		entry = self.dispatch.get(clean[0])
+		if entry is None:
+			log.warning("Unknown instruction: %s", " ".join(clean))
+			return []
+
+		if self.__encode_cache is not None and clean[0] in self.cacheable:
+			res = self.__encode_cache(tuple(clean))
 		else:
-			#debugging
-			print("Error: " + line)
-
-			#check for critical errors
-			for r in res:
-				for e in r:
-					if int(e) != 0 and int(e) != 1:
-						raise Not__binaryNumber(r)
-				if len(r) != 32:
-					raise WrongInstructionSize(len(r))
-
-		#return instruction
-		# print("res: ", type(res[0]))
-		# print("res, ", res)
-		# byte_num = 8
-		# prefix = 0x00000000
-		# print("prefix: ", prefix)
-		# prefix = prefix.to_bytes(byte_num, byteorder = 'big', signed = True)
-		
-		# prefix = '{0:32b}'.format(prefix)
-		# print("str(prefix): ", str(prefix))
-		# print("bin(int(prefix)): ", format(prefix,8))
-		# res = prefix + str(bin(int(prefix,8)))
-		# res[0] = "0000000" + res[0]
-		print("res: ", res)
+			res = entry[1](clean, pc)
+		if self.stats is not None:
+			self.stats.count("instr_" + entry[0], len(res))
+		if self.verbose:
+			log.debug("%s -> %s", " ".join(clean), [to_bin(w) for w in res])
+		return res
+
+	#mnemonic -> (format, handler), every handler takes the tokens of a line
+	#and its address and returns the encoded words
+	def __dispatch_table(self):
+		shapes = {
+			"R": self.__op_R, "I": self.__op_I, "S": self.__op_S,
+			"SB": self.__op_SB, "U": self.__op_U, "UJ": self.__op_UJ
+		}
+		table = {}
+		for instr, fmt in self.formats.items():
+			if fmt != "pseudo":
+				table[instr] = (fmt, shapes[fmt])
+
+		for instr in LOADS:
+			table[instr] = ("I", self.__op_load)
+		table["jalr"] = ("I", self.__op_jalr)
+		table["ecall"] = ("I", self.__op_system)
+		table["ebreak"] = ("I", self.__op_system)
+		table["auipc"] = ("U", self.__op_auipc)
+
+		#pseudo instructions expand through pseudo.PSEUDO
+		for instr in PSEUDO:
+			table[instr] = ("pseudo", self.__op_pseudo)
+		return table
+
+	#mnemonics whose words depend on nothing but their tokens, no pc, no
+	#label. Their lines go through the encode cache
+	def __cacheable(self):
+		fixed = (self.__op_R, self.__op_I, self.__op_load, self.__op_S, self.__op_U, self.__op_system)
+		cacheable = set(x for x, entry in self.dispatch.items() if entry[1] in fixed)
+		for instr, entry in PSEUDO.items():
+			mnemonics = [t[0] for templates in entry.templates.values() for t in templates]
+			if all(x in cacheable for x in mnemonics):
+				cacheable.add(instr)
+		return frozenset(cacheable)
+
+	#words of a cacheable line given as a token tuple, the tokens are already
+	#normalized by parse_line (no commas, parens or comments) so equal lines
+	#share one key. Any pc will do, these encodings don't read it
+	def __encode_fixed(self, key):
+		return tuple(self.dispatch[key[0]][1](key, 0))
+
+	#operand layouts of the base formats
+	def __op_R(self, clean, pc):
+		return [self.__R_word(clean[0], self.__reg_map(clean[1]), self.__reg_map(clean[2]))]
+
+	def __op_I(self, clean, pc):
+		return [self.__I_word(clean[0], self.__reg_map(clean[1]), clean[2])]
+
+	#loads, base imm or, from "lw rd, imm(base)", base rd imm. rd is
+	#dropped like the destination of li, results are only named by [N]
+	def __op_load(self, clean, pc):
+		if len(clean) == 4:
+			return [self.__I_word(clean[0], self.__reg_map(clean[1]), clean[3])]
+		if len(clean) != 3:
+			raise WrongOperandCount(clean)
+		return [self.__I_word(clean[0], self.__reg_map(clean[1]), clean[2])]
+
+	def __op_jalr(self, clean, pc):
+		#"jalr rd, imm(base)", rd dropped like for loads
+		if len(clean) == 4:
+			return [self.__I_word(clean[0], self.__reg_map(clean[1]), self.__target(clean[3],pc))]
+		if len(clean) == 3:
+			return [self.__I_word(clean[0], self.__reg_map(clean[1]), self.__target(clean[2],pc))]
+		return [self.__I_word(clean[0], self.__reg_map(clean[1]), "0")]
+
+	#ecall/ebreak, the immediate is the f7 column of instr_data.dat
+	def __op_system(self, clean, pc):
+		return [self.__I_word(clean[0], self.__reg_map("x0"), self.instr_fields[clean[0]][2])]
+
+	def __op_S(self, clean, pc):
+		if len(clean) != 4:
+			raise WrongOperandCount(clean)
+		return [self.__S_word(clean[0], self.__reg_map(clean[1]), self.__reg_map(clean[2]), int(clean[3]))]
+
+	def __op_SB(self, clean, pc):
+		return [self.__SB_word(clean[0], self.__reg_map(clean[1]), self.__reg_map(clean[2]), self.__target(clean[3],pc))]
+
+	def __op_U(self, clean, pc):
+		return [self.__U_word(clean[0], clean[1])]
+
+	def __op_UJ(self, clean, pc):
+		if len(clean) == 3:
+			return [self.__UJ_word(clean[0], self.__target(clean[2],pc))]
+		return [self.__UJ_word(clean[0], self.__target(clean[1],pc))]
+
+	#pc relative, so a label is resolved like a branch target
+	def __op_auipc(self, clean, pc):
+		return [self.__U_word(clean[0], self.__target(clean[1],pc))]
+
+	#pseudo instructions, every base instruction of the expansion is
+	#encoded at its own address
+	def __op_pseudo(self, clean, pc):
+		dispatch = self.dispatch
+		res = []
+		for tokens in expand(clean):
+			res.extend(dispatch[tokens[0]][1](tokens, pc))
+			pc += 4
 		return res
 
 	#AFTER READING FILE	
 	def __post(self):
 
-		if len(self.instructions) == 0:
+		if len(self.words) == 0:
 			raise EmptyFile()
+		stats = self.stats
+
+		#shares self.words, text is only rendered when an output reads it
+		self.instructions = InstructionBuffer(self.words, WIDE_BITS, self.hexMode, self.nibble)
+
 		if "b" in self.output_type:
-			print("-----Writing to binary file-----")
 			#make it [their .s file name].bin
 			fname = self.filename.split("/")[-1]
-			print("Output file: " + fname[:-2] + ".bin")
-
-			if not os.path.exists(fname[:-2]):
-				os.mkdir(fname[:-2])
-				os.mkdir(f"{fname[:-2]}/bin")
-			else:
-				if not os.path.exists("bin"):
-					os.mkdir(f"{fname[:-2]}/bin")
-
-			#with open("output/"+fname[:-2]+"/bin/" + fname[:-2] + ".bin", "wb") as f:
-			with open(fname[:-2]+"/bin/" + fname[:-2] + ".bin", "wb") as f:
-				for elem in self.instructions:
-					#split into bytes
-					byte_array = [elem[i:i+8] for i in range(0,len(elem),8)]
-					byte_array.reverse()
-					print("byte_array: ", byte_array)
-					byte_list = [int(b,2) for b in byte_array]
-
-					f.write(bytearray(byte_list))
-				f.close()
+			log.info("Output file: %s.bin", fname[:-2])
+
+			#words packed into one buffer and written in one go
+			name = fname[:-2]+"/bin/" + fname[:-2] + ".bin"
+			with stage(stats, "write"):
+				if self.sink is None and self.packed is None:
+					os.makedirs(f"{fname[:-2]}/bin", exist_ok = True)
+					write_image(name, self.words, self.word_bytes, self.byteorder, self.use_mmap)
+					size = len(self.words)*self.word_bytes
+				else:
+					data = self.__image()
+					size = len(data)
+					if self.sink is not None:
+						self.sink.write(name, data)
+					else:
+						os.makedirs(f"{fname[:-2]}/bin", exist_ok = True)
+						with open(name, "wb") as f:
+							f.write(data)
+			if stats is not None:
+				stats.count("bytes_written", size)
 
 		if "t" in self.output_type:
-			print("------Writing to Text file------")
 			#make it [their .s file name].txt
 
 			fname = self.filename.split("/")[-1]
-			print("Output file: " + fname[:-2] + ".txt")
-
-			if not os.path.exists(fname[:-2]):
-				os.mkdir(fname[:-2])
-				os.mkdir(f"{fname[:-2]}/txt")
-			else:
-				if not os.path.exists("txt"):
-					os.mkdir(f"{fname[:-2]}/txt")
+			log.info("Output file: %s.txt", fname[:-2])
 
+			with stage(stats, "render"):
+				text = self.instructions.joined() + "\n"
 			#with open("output/"+fname[:-2]+"text/" + fname[:-2] + ".txt", "w") as f:
-			with open(fname[:-2]+"/txt/" + fname[:-2] + ".txt", "w") as f:
-				for elem in self.instructions:
-					f.write(elem + "\n")
+			name = fname[:-2]+"/txt/" + fname[:-2] + ".txt"
+			with stage(stats, "write"):
+				if self.sink is not None:
+					self.sink.write(name, text.encode())
+				else:
+					os.makedirs(f"{fname[:-2]}/txt", exist_ok = True)
+					with open(name, "w") as f:
+						f.write(text)
+			if stats is not None:
+				stats.count("bytes_written", len(text.encode()))
 
 		if "p" in self.output_type:
-			print("------Printing Output------")
-			for elem in self.instructions:
-				print(elem)
+			with stage(stats, "render"):
+				text = self.instructions.joined()
+			print(text)
+
+		if stats is not None:
+			stats.report()
 
 		if "r" in self.output_type:
 			return self.instructions
 
-		print("Number of instructions: {}".format(len(self.instructions)))
+		log.info("Number of instructions: %d", len(self.words))
+
+	#bytes of the .bin, padded words or a packed bitstream
+	def __image(self):
+		if self.packed is not None:
+			return pack_stream(self.words, self.packed)
+		return pack_words(self.words, self.word_bytes, self.byteorder)
 
 	#DO THE MAGIC
 	def convert(self,filename):
 		if filename[-2::] != ".s":
 			raise WrongFileType()
 		self.filename = filename
-		self.code = self.__read_in_advance()
-		self.instructions = self.__get_instructions()
-		print("instructions:", type(self.instructions[0]))
-
-		for i in range(len(self.instructions)):
-			self.instructions[i] = "00000000" + self.instructions[i]
-			self.instructions[i] = "00000000" + self.instructions[i]
-			self.instructions[i] = "000000" + self.instructions[i]
-			# self.instructions[i] = "00000000" + self.instructions[i]
-			# print("instruction: ", instruction)
-			
-		print("instructions:", self.instructions[0])
-		if self.hexMode:
-			for i in range(len(self.instructions)):
-				self.instructions[i] = self.hex(self.instructions[i])
-		if self.nibble and not self.hexMode:
-			for i in range(len(self.instructions)):
-				self.instructions[i] = nibbleForm(self.instructions[i])
+		with stage(self.stats, "read"):
+			self.code = self.__read_in_advance()
+		with stage(self.stats, "encode"):
+			self.words = self.__get_instructions()
+		self.instructions = []
+
+		return self.__post()
+
+	#assemble source held in memory, no file is read or written: text is a
+	#str of assembly, lines an iterable of lines (a list, a generator, an
+	#open text file). Returns the words like convert_ret(); out and text_out,
+	#binary streams given by the caller, get what convert() would write to the
+	#.bin and the .txt. output_type isn't consulted, the streams decide
+	def convert_string(self, text, out = None, text_out = None):
+		return self.convert_lines(text.splitlines(), out, text_out)
+
+	def convert_lines(self, lines, out = None, text_out = None):
+		stats = self.stats
+		with stage(stats, "read"):
+			self.code = self.__read(lines)
+		with stage(stats, "encode"):
+			self.words = self.__get_instructions()
+		if len(self.words) == 0:
+			raise EmptyFile()
+
+		if out is not None:
+			with stage(stats, "write"):
+				data = self.__image()
+				out.write(data)
+			if stats is not None:
+				stats.count("bytes_written", len(data))
+
+		if text_out is not None:
+			with stage(stats, "render"):
+				data = (InstructionBuffer(self.words, WIDE_BITS, self.hexMode, self.nibble).joined() + "\n").encode()
+			with stage(stats, "write"):
+				text_out.write(data)
+			if stats is not None:
+				stats.count("bytes_written", len(data))
+
+		self.instructions = InstructionBuffer(self.words, WORD_BITS, self.hexMode, self.nibble)
+		if stats is not None:
+			stats.report()
+		return self.instructions
+
+	#assemble filename on its own into a link.Relocatable, labels the file
+	#doesn't define become relocations instead of UnknownLabel
+	def relocatable(self, filename, name = None):
+		if filename[-2::] != ".s":
+			raise WrongFileType()
+		import hashlib
+		with open(filename, "rb") as f:
+			source = f.read()
+		self.filename = filename
+		directives = []
+		self.code, self.line_addr, self.symbols = layout(
+			source.decode().splitlines(), self.formats, directives
+		)
 
+		#opcode -> format of the word a pseudo instruction turned into
+		kinds = {}
+		for instr, fmt in self.formats.items():
+			if fmt != "pseudo" and instr in self.instr_fields:
+				kinds[self.instr_fields[instr][0]] = fmt
+
+		words = array('Q')
+		relocs = []
+		problems = []
+		self.__unresolved = []
+		try:
+			for line, (clean, pc) in enumerate(zip(self.code, self.line_addr)):
+				try:
+					words.extend(self.__interpret(clean, pc))
+				except ProducerError as e:
+					problems.extend((line, x, reason) for _, x, reason in e.problems)
+					continue
+				#lines with a target assemble to a single word
+				for x, at in self.__unresolved:
+					relocs.append((len(words) - 1, kinds[words[-1] & 0x7F], x, at))
+				self.__unresolved.clear()
+		finally:
+			self.__unresolved = None
+		if len(problems) > 0:
+			raise ProducerError(problems)
+
+		self.words = words
+		return Relocatable(
+			filename if name is None else name, words, dict(self.symbols),
+			exports_of(directives), relocs, hashlib.sha256(source).hexdigest()
+		)
+
+	#write/return already encoded words for filename as convert() would,
+	#for callers that kept the words from an earlier run
+	def emit(self, filename, words):
+		self.filename = filename
+		self.code = []
+		self.words = words if isinstance(words, array) else array('Q', words)
 		return self.__post()
 
 	def convert_ret(self,filename):
 		if filename[-2::] != ".s":
 			raise WrongFileType()
 		self.filename = filename
-		#self.r_map, self.instr_data = self.__pre()
-		self.code = self.__read_in_advance()
-		self.instructions = self.__get_instructions()
-
-		if self.hexMode:
-			for i in range(len(self.instructions)):
-				self.instructions[i] = self.hex(self.instructions[i])
-		if self.nibble and not self.hexMode:
-			for i in range(len(self.instructions)):
-				self.instructions[i] = nibbleForm(self.instructions[i])
-		return self.instructions
\ No newline at end of file
+		with stage(self.stats, "read"):
+			self.code = self.__read_in_advance()
+		with stage(self.stats, "encode"):
+			self.words = self.__get_instructions()
+		self.instructions = InstructionBuffer(self.words, WORD_BITS, self.hexMode, self.nibble)
+		if self.stats is not None:
+			self.stats.report()
+		return self.instructions
+
+	#assemble a path, file object or iterable of lines one line at a time,
+	#yielding every encoded word as an int without keeping the file around.
+	#a forward branch makes a rewindable source (path or seekable file) do a
+	#label only pass first, anything else holds lines back until the label shows up
+	def iter_convert(self, source):
+		if isinstance(source, (str, os.PathLike)):
+			with open(source, "r") as file:
+				yield from self.__stream(file, lambda: self.__symbols_of(source))
+			return
+
+		rewind = None
+		if hasattr(source, "seekable") and source.seekable():
+			rewind = lambda: self.__symbols_of(source)
+		yield from self.__stream(source, rewind)
+
+	#label table of a whole source, restores the read position of file objects
+	def __symbols_of(self, source):
+		if isinstance(source, (str, os.PathLike)):
+			with open(source, "r") as file:
+				return symbol_table(file, self.formats)
+
+		pos = source.tell()
+		source.seek(0)
+		symbols = symbol_table(iter(source.readline, ""), self.formats)
+		source.seek(pos)
+		return symbols
+
+	def __stream(self, lines, rewind):
+		self.symbols = {}
+		pending = deque() #(tokens, pc) waiting on a forward label
+		addr = 0
+
+		#readline keeps tell() usable on text files
+		if hasattr(lines, "readline"):
+			lines = iter(lines.readline, "")
+
+		#producers.ProducerMap from the first %label on, a line can't wait for
+		#the rest of the file so its references are checked right away
+		producers = None
+		names = []
+		line = 0
+
+		for raw in lines:
+			labels, clean = parse_line(raw)
+			for label in labels:
+				if label[0] == "%":
+					names.append(label[1:])
+				else:
+					self.symbols[label] = addr
+
+			if clean is not None:
+				pc = addr
+				addr += 4*line_size(clean, self.formats)
+				if producers is not None or len(names) > 0:
+					if producers is None:
+						producers = ProducerMap()
+					producers.resolve(clean, line, pc >> 2)
+					producers.check()
+					for name in names:
+						producers.define(name, (addr - 4) >> 2)
+					names = []
+				line += 1
+				if len(pending) == 0:
+					try:
+						yield from self.__interpret(clean, pc)
+						continue
+					except UnknownLabel:
+						if rewind is None:
+							pending.append((clean, pc))
+							continue
+						#second pass, all labels known from here on
+						self.symbols = rewind()
+						rewind = None
+						yield from self.__interpret(clean, pc)
+						continue
+				pending.append((clean, pc))
+
+			#a new label may unblock the lines held back
+			if len(labels) > 0:
+				while len(pending) > 0:
+					try:
+						words = self.__interpret(*pending[0])
+					except UnknownLabel:
+						break
+					pending.popleft()
+					yield from words
+
+		while len(pending) > 0:
+			yield from self.__interpret(*pending.popleft())
@@ -0,0 +1,210 @@
+from array import array
+import os
+
+from .encoding import WORD_BYTES, NUMPY_CHUNK, NUMPY_MIN_WORDS, PACKED_MAGIC, _numpy, to_hex, unpack_words, unpack_stream, is_packed
+from .convert import AssemblyConverter
+from .tables import load_tables
+
+__all__ = ['Disassembler', 'TruncatedImage']
+
+class TruncatedImage( Exception ):
+	def __init__(self, message = "Image size is not a multiple of the word size"):
+		self.message = message
+		super().__init__(self.message)
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#decode key of a word, opcode | f3 << 7 | f7 << 10
+KEY_BITS = 17
+
+#format codes of the decode table, index 0 is "no such instruction"
+_FORMATS = ["", "R", "I", "S", "SB", "U", "UJ", "system"]
+
+def _key(opcode, f3, f7):
+	return opcode | f3 << 7 | f7 << 10
+
+#key -> index into names, built from instr_data.dat and the converter's formats.
+#Fields a format doesn't encode (f7 of I/S/SB, f3 and f7 of U/UJ) match any
+#value; shifts whose f7 column is given (slri/srai ...) match on the upper
+#immediate bits, ecall/ebreak are told apart by their immediate
+def _decode_table(tables, formats):
+	names = [None]
+	fmts = [0]
+	system = {}
+	table = [0]*(1 << KEY_BITS)
+	exact = []
+
+	for instr, fmt in formats.items():
+		if fmt == "pseudo" or instr not in tables.instr_fields:
+			continue
+		opcode, f3, f7 = tables.instr_fields[instr]
+		col = tables.instr_data[instr][2] if len(tables.instr_data[instr]) > 2 else "-1"
+		if fmt == "I" and len(col) == 12:
+			system[f7] = instr
+			fmt = "system"
+		names.append(instr)
+		fmts.append(_FORMATS.index(fmt))
+		i = len(names) - 1
+
+		if fmt == "R" or (fmt == "I" and len(col) == 7):
+			exact.append((_key(opcode, f3, f7), i))
+		if fmt == "R":
+			continue
+		f3s = range(8) if fmt in ("U", "UJ") else [f3]
+		for g in f3s:
+			for h in range(128):
+				if table[_key(opcode, g, h)] == 0:
+					table[_key(opcode, g, h)] = i
+
+	for k, i in exact:
+		table[k] = i
+	return table, names, fmts, system
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+def _signed(x, bits):
+	return ((x ^ (1 << (bits - 1))) - (1 << (bits - 1)))
+
+#fields of every word as plain lists: (word, table index, rs1, rs2, I imm, S imm, SB imm,
+#U imm, UJ imm), the exact inverse of the pack_* layouts in encoding.py
+def _fields(table, words):
+	key = [table[w & 0x7F | (w >> 12 & 0x7) << 7 | (w >> 25 & 0x7F) << 10] for w in words]
+	rs1 = [(w >> 32 & 0x1F) << 5 | w >> 15 & 0x1F for w in words]
+	rs2 = [(w >> 37 & 0x1F) << 5 | w >> 20 & 0x1F for w in words]
+	imm_i = [_signed(w >> 20 & 0xFFF, 12) for w in words]
+	imm_s = [_signed((w >> 25 & 0x7F) << 5 | w >> 7 & 0x1F, 12) for w in words]
+	imm_sb = [_signed(
+		(w >> 31 & 0x1) << 11 | (w >> 7 & 0x1) << 10 | (w >> 25 & 0x3F) << 4 | w >> 8 & 0xF, 12
+	) for w in words]
+	imm_u = [_signed(w >> 12 & 0xFFFFF, 20) for w in words]
+	imm_uj = [_signed(
+		(w >> 31 & 0x1) << 19 | (w >> 21 & 0x3FF) | (w >> 20 & 0x1) << 10 | (w >> 12 & 0xFF) << 11, 20
+	) for w in words]
+	return words, key, rs1, rs2, imm_i, imm_s, imm_sb, imm_u, imm_uj
+
+#the same fields computed over a whole chunk at once, table is the decode table as an array
+def _numpy_fields(np, table, w):
+	w = w.astype(np.int64)
+	key = table[w & 0x7F | (w >> 12 & 0x7) << 7 | (w >> 25 & 0x7F) << 10]
+	rs1 = (w >> 32 & 0x1F) << 5 | w >> 15 & 0x1F
+	rs2 = (w >> 37 & 0x1F) << 5 | w >> 20 & 0x1F
+	imm_i = _signed(w >> 20 & 0xFFF, 12)
+	imm_s = _signed((w >> 25 & 0x7F) << 5 | w >> 7 & 0x1F, 12)
+	imm_sb = _signed((w >> 31 & 0x1) << 11 | (w >> 7 & 0x1) << 10 | (w >> 25 & 0x3F) << 4 | w >> 8 & 0xF, 12)
+	imm_u = _signed(w >> 12 & 0xFFFFF, 20)
+	imm_uj = _signed((w >> 31 & 0x1) << 19 | (w >> 21 & 0x3FF) | (w >> 20 & 0x1) << 10 | (w >> 12 & 0xFF) << 11, 20)
+	return [x.tolist() for x in (w, key, rs1, rs2, imm_i, imm_s, imm_sb, imm_u, imm_uj)]
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#turns .bin images (or lists of words) back into source lines that assemble to the
+#same words. Operands come out as [N], the 10 bit field can't tell x5 from [5].
+#Words are decoded a chunk at a time, fields vectorized with numpy when it's
+#installed, so an image of any size streams through in bounded memory
+class Disassembler:
+
+	def __init__(self, word_bytes = WORD_BYTES, byteorder = 'little'):
+		#.bin layout, as given to AssemblyConverter
+		self.word_bytes = word_bytes
+		self.byteorder = byteorder
+		tables = load_tables()
+		self.table, self.names, self.fmts, self.system = _decode_table(tables, AssemblyConverter.formats)
+		#numpy copy of table, made on first vectorized decode
+		self.__np_table = None
+
+	def __str__(self):
+		return "Disassembler(word_bytes={}, byteorder={})".format(self.word_bytes, self.byteorder)
+
+	#source line of one word
+	def decode(self, word):
+		return self.__lines(_fields(self.table, [word]))[0]
+
+	#source lines of words, a list per chunk
+	def __chunks(self, words):
+		np = _numpy() if len(words) >= NUMPY_MIN_WORDS else None
+		if np is None:
+			for i in range(0, len(words), NUMPY_CHUNK):
+				yield self.__lines(_fields(self.table, words[i:i+NUMPY_CHUNK]))
+			return
+
+		if isinstance(words, array) and words.typecode == 'Q':
+			w = np.frombuffer(words, dtype = np.uint64)
+		else:
+			w = np.asarray(words, dtype = np.uint64)
+		if self.__np_table is None:
+			self.__np_table = np.array(self.table, dtype = np.int16)
+		for i in range(0, len(w), NUMPY_CHUNK):
+			yield self.__lines(_numpy_fields(np, self.__np_table, w[i:i+NUMPY_CHUNK]))
+
+	def __lines(self, fields):
+		names, fmts, system = self.names, self.fmts, self.system
+		lines = []
+		for w, i, rs1, rs2, imm_i, imm_s, imm_sb, imm_u, imm_uj in zip(*fields):
+			fmt = fmts[i]
+			if fmt == 1:
+				lines.append("{} [{}] [{}]".format(names[i], rs1, rs2))
+			elif fmt == 2:
+				lines.append("{} [{}] {}".format(names[i], rs1, imm_i))
+			elif fmt == 3:
+				lines.append("{} [{}] [{}] {}".format(names[i], rs1, rs2, imm_s))
+			elif fmt == 4:
+				lines.append("{} [{}] [{}] {}".format(names[i], rs1, rs2, imm_sb))
+			elif fmt == 5:
+				lines.append("{} {}".format(names[i], imm_u))
+			elif fmt == 6:
+				lines.append("{} {}".format(names[i], imm_uj))
+			elif fmt == 7 and imm_i & 0xFFF in system:
+				lines.append(system[imm_i & 0xFFF])
+			else:
+				#key without an instruction, kept so line n is still word n
+				lines.append("# unknown {}".format(to_hex(w)))
+		return lines
+
+	#source lines of words, one at a time
+	def iter_words(self, words):
+		for lines in self.__chunks(words):
+			yield from lines
+
+	#source lines of a .bin image, read and decoded NUMPY_CHUNK words at a time,
+	#padded words or a packed bitstream
+	def iter_image(self, path):
+		for lines in self.__image_chunks(path):
+			yield from lines
+
+	def disassemble(self, path):
+		return list(self.iter_image(path))
+
+	#stream a whole image to out, a path or a text file object
+	def write(self, path, out):
+		if isinstance(out, (str, os.PathLike)):
+			with open(out, "w") as f:
+				return self.write(path, f)
+
+		count = 0
+		for lines in self.__image_chunks(path):
+			out.write("\n".join(lines) + "\n")
+			count += len(lines)
+		return count
+
+	def __image_chunks(self, path):
+		size = self.word_bytes*NUMPY_CHUNK
+		with open(path, "rb") as f:
+			#a packed bitstream (AssemblyConverter(packed=...)) is one bulk read
+			if is_packed(f.read(len(PACKED_MAGIC))):
+				f.seek(0)
+				yield from self.__chunks(unpack_stream(f.read())[1])
+				return
+			f.seek(0)
+			while True:
+				data = f.read(size)
+				if len(data) == 0:
+					return
+				if len(data) % self.word_bytes != 0:
+					raise TruncatedImage("{}: {} bytes left over".format(path, len(data) % self.word_bytes))
+				yield from self.__chunks(unpack_words(data, self.word_bytes, self.byteorder))
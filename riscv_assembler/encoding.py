@@ -0,0 +1,334 @@
+from array import array
+import sys
+
+__all__ = [
+	'WORD_BITS', 'PAD_BITS', 'WIDE_BITS', 'WORD_BYTES',
+	'field_ints', 'reg_num', 'pack_R', 'pack_I', 'pack_S', 'pack_SB', 'pack_U', 'pack_UJ',
+	'to_bin', 'to_hex', 'render', 'render_text', 'pack_words', 'unpack_words', 'write_image',
+	'PACKED_MAGIC', 'BadPackedStream', 'pack_bits', 'unpack_bits', 'pack_stream', 'unpack_stream',
+	'read_stream', 'is_packed'
+]
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#width of an encoded instruction, the usual 32 bit layout plus the
+#upper 5 bits of rs1/rs2 sitting on top of it
+WORD_BITS = 42
+#leading zeros convert() puts in front of every instruction
+PAD_BITS = 22
+WIDE_BITS = WORD_BITS + PAD_BITS
+
+#operands are 10 bits wide, split into a high and low half of 5 bits
+REG_MASK = 0x3FF
+
+#register number -> both halves already shifted into place, built once per
+#process so packing an operand is one list index instead of two shifts/masks
+RS1_FIELD = tuple((r >> 5) << 32 | (r & 0x1F) << 15 for r in range(REG_MASK + 1))
+RS2_FIELD = tuple((r >> 5) << 37 | (r & 0x1F) << 20 for r in range(REG_MASK + 1))
+
+#[opcode, f3, f7] bit strings from instr_data.dat as ints, fields the
+#format doesn't use ("-1" or missing) become 0
+def field_ints(i_data):
+	fields = {}
+	for instr, elems in i_data.items():
+		elems = (list(elems) + ["-1"]*3)[:3]
+		fields[instr] = tuple(0 if e == "-1" else int(e, 2) for e in elems)
+	return fields
+
+#register operand ("x5", "x5\n" or a [N] distance) to its integer value
+def reg_num(x):
+	if type(x) == str:
+		x = int(x[1::])
+	return x & REG_MASK
+
+#every layout below is [hi rs2][hi rs1][standard 32 bit word], rd is always x0
+#rs1/rs2 are register numbers in range(REG_MASK + 1)
+def pack_R(opcode, f3, f7, rs1, rs2):
+	return RS2_FIELD[rs2] | RS1_FIELD[rs1] | f7 << 25 | f3 << 12 | opcode
+
+def pack_I(opcode, f3, rs1, imm):
+	return RS1_FIELD[rs1] | (imm & 0xFFF) << 20 | f3 << 12 | opcode
+
+def pack_S(opcode, f3, rs1, rs2, imm):
+	return (RS2_FIELD[rs2] | RS1_FIELD[rs1] | (imm >> 5 & 0x7F) << 25
+		| f3 << 12 | (imm & 0x1F) << 7 | opcode)
+
+def pack_SB(opcode, f3, rs1, rs2, imm):
+	hi = (imm >> 11 & 0x1) << 6 | (imm >> 4 & 0x3F) # imm[12|10:5]
+	lo = (imm & 0xF) << 1 | (imm >> 10 & 0x1) # imm[4:1|11]
+	return (RS2_FIELD[rs2] | RS1_FIELD[rs1] | hi << 25
+		| f3 << 12 | lo << 7 | opcode)
+
+def pack_U(opcode, imm):
+	return (imm & 0xFFFFF) << 12 | opcode
+
+def pack_UJ(opcode, imm):
+	#imm[20|10:1|11|19:12]
+	mod_imm = (imm >> 19 & 0x1) << 19
+	mod_imm |= (imm & 0x3FF) << 9
+	mod_imm |= (imm >> 10 & 0x1) << 8
+	mod_imm |= imm >> 11 & 0xFF
+	return mod_imm << 12 | opcode
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#rendering, only used once the words are about to leave the assembler
+def to_bin(word, width = WORD_BITS):
+	return format(word, '0{}b'.format(width))
+
+def to_hex(word):
+	return "0x" + format(word, '08x')
+
+def nibbleForm(x, delim = '\t'):
+	return delim.join([x[i:i+4] for i in range(0, len(x), 4)])
+
+#numpy is optional, imported on first use only
+_np = False
+
+def _numpy():
+	global _np
+	if _np is False:
+		try:
+			import numpy
+			_np = numpy
+		except ImportError:
+			_np = None
+	return _np
+
+#below this many words per-word formatting beats setting up numpy arrays
+NUMPY_MIN_WORDS = 256
+#rows rendered at a time, keeps the (rows x bits) scratch arrays small
+NUMPY_CHUNK = 1 << 14
+
+def _python_text(words, width, hexMode, nibble, delim):
+	if hexMode:
+		return "\n".join([to_hex(w) for w in words])
+	spec = '0{}b'.format(width)
+	if nibble:
+		return "\n".join([nibbleForm(format(w, spec), delim) for w in words])
+	return "\n".join([format(w, spec) for w in words])
+
+#one chunk of words to text with vectorized bit/digit extraction, every
+#row of the char matrix is one output line including its newline
+def _numpy_chunk(np, w, width, hexMode, nibble, delim):
+	n = len(w)
+	if hexMode:
+		shifts = np.arange(60, -1, -4, dtype = np.uint64)
+		digits = (w[:, None] >> shifts) & np.uint64(0xF)
+		mat = np.empty((n, 19), dtype = np.uint8)
+		mat[:, 0] = ord("0")
+		mat[:, 1] = ord("x")
+		mat[:, 2:18] = np.frombuffer(b"0123456789abcdef", dtype = np.uint8)[digits]
+		mat[:, 18] = ord("\n")
+		#at least 8 digits, more when the word needs them, same as to_hex
+		nonzero = digits != 0
+		first = np.where(nonzero.any(axis = 1), nonzero.argmax(axis = 1), 16)
+		keep = np.ones((n, 19), dtype = bool)
+		keep[:, 2:18] = np.arange(16)[None, :] >= np.minimum(first, 8)[:, None]
+		return mat[keep].tobytes()
+
+	#'0'/'1' chars of every byte value, looked up for the 8 big endian bytes of each word
+	table = np.array([[ord(c) for c in format(b, '08b')] for b in range(256)], dtype = np.uint8)
+	bits = table[w.astype('>u8').view(np.uint8).reshape(n, 8)].reshape(n, 64)[:, 64 - width:]
+	if nibble:
+		cols = np.arange(width)
+		mat = np.full((n, width + (width + 3)//4), ord(delim), dtype = np.uint8)
+		mat[:, cols + cols//4] = bits
+	else:
+		mat = np.empty((n, width + 1), dtype = np.uint8)
+		mat[:, :width] = bits
+	mat[:, -1] = ord("\n")
+	return mat.tobytes()
+
+#the whole program as one block of text, one word per line
+def render_text(words, width = WORD_BITS, hexMode = False, nibble = False, delim = '\t'):
+	#numpy only imported when the vectorized path can run
+	np = None
+	if len(words) >= NUMPY_MIN_WORDS and len(delim) == 1 and width <= 64:
+		np = _numpy()
+	if np is None:
+		return _python_text(words, width, hexMode, nibble, delim)
+
+	if isinstance(words, array) and words.typecode == 'Q':
+		w = np.frombuffer(words, dtype = np.uint64)
+	else:
+		w = np.asarray(words, dtype = np.uint64)
+	chunks = [
+		_numpy_chunk(np, w[i:i+NUMPY_CHUNK], width, hexMode, nibble, delim)
+		for i in range(0, len(w), NUMPY_CHUNK)
+	]
+	return b"".join(chunks)[:-1].decode("ascii")
+
+#render a list of words the way convert/convert_ret hand them back
+def render(words, width = WORD_BITS, hexMode = False, nibble = False, delim = '\t'):
+	if len(words) == 0:
+		return []
+	return render_text(words, width, hexMode, nibble, delim).split("\n")
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#bytes per word in .bin files, the padded 64 bit word
+WORD_BYTES = WIDE_BITS // 8
+#words packed per slice when writing through mmap
+MMAP_CHUNK = 1 << 16
+
+#array typecode holding exactly size bytes, if the platform has one
+def _typecode(size):
+	for code in "BHILQ":
+		if array(code).itemsize == size:
+			return code
+	return None
+
+#every word packed into one contiguous buffer, word_bytes each
+def pack_words(words, word_bytes = WORD_BYTES, byteorder = 'little'):
+	code = _typecode(word_bytes)
+	if code is not None:
+		if isinstance(words, array) and words.typecode == code and byteorder == sys.byteorder:
+			return words.tobytes()
+		buf = array(code, words)
+		if byteorder != sys.byteorder:
+			buf.byteswap()
+		return buf.tobytes()
+	return b"".join([w.to_bytes(word_bytes, byteorder) for w in words])
+
+#words of a packed buffer, the inverse of pack_words
+def unpack_words(data, word_bytes = WORD_BYTES, byteorder = 'little'):
+	code = _typecode(word_bytes)
+	if code is not None:
+		buf = array(code)
+		buf.frombytes(data)
+		if byteorder != sys.byteorder:
+			buf.byteswap()
+		return buf if code == 'Q' else array('Q', buf)
+	return array('Q', [
+		int.from_bytes(data[i:i+word_bytes], byteorder)
+		for i in range(0, len(data), word_bytes)
+	])
+
+#write a whole image in one call, or through an mmap of the output file
+#so very large images never need the full buffer in memory at once
+def write_image(path, words, word_bytes = WORD_BYTES, byteorder = 'little', use_mmap = False):
+	if not use_mmap:
+		with open(path, "wb") as f:
+			f.write(pack_words(words, word_bytes, byteorder))
+		return
+
+	import mmap
+	size = len(words)*word_bytes
+	with open(path, "w+b") as f:
+		if size == 0:
+			return
+		f.seek(size - 1)
+		f.write(b"\0")
+		f.flush()
+		with mmap.mmap(f.fileno(), size) as mm:
+			for i in range(0, len(words), MMAP_CHUNK):
+				chunk = pack_words(words[i:i+MMAP_CHUNK], word_bytes, byteorder)
+				mm[i*word_bytes:i*word_bytes + len(chunk)] = chunk
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#packed bitstream: every word at width bits, back to back with no padding,
+#little endian bit order (bit 0 of word 1 follows bit width-1 of word 0).
+#The file starts with a 13 byte header, the magic, the width as one byte
+#and the word count as 8 bytes little endian
+PACKED_MAGIC = b"RVPK"
+PACKED_HEADER_BYTES = len(PACKED_MAGIC) + 1 + 8
+
+class BadPackedStream( ValueError ):
+	def __init__(self, message = "Not a packed bitstream, or one cut short"):
+		self.message = message
+		super().__init__(self.message)
+
+def _check_width(width):
+	if not 0 < width <= 64:
+		raise ValueError("Packed width must be 1 to 64 bits, not {}".format(width))
+
+#8 words of width bits fill exactly width bytes, so the stream is built one
+#byte aligned group of 8 at a time
+def _python_pack(words, width):
+	shifts = [j*width for j in range(8)]
+	out = bytearray()
+	for i in range(0, len(words), 8):
+		v = 0
+		for w, s in zip(words[i:i+8], shifts):
+			v |= w << s
+		out += v.to_bytes(width, 'little')
+	return bytes(out[:(len(words)*width + 7)//8])
+
+def _python_unpack(data, width, count):
+	shifts = [j*width for j in range(8)]
+	mask = (1 << width) - 1
+	words = array('Q')
+	for k in range(0, count, 8):
+		v = int.from_bytes(data[k//8*width:(k//8 + 1)*width], 'little')
+		words.extend([(v >> s) & mask for s in shifts[:count - k]])
+	return words
+
+#bits of every word as a (words x 64) matrix, cut to width columns and packed again
+def _numpy_pack(np, w, width):
+	bits = np.unpackbits(w.astype('<u8').view(np.uint8), bitorder = 'little').reshape(len(w), 64)
+	return np.packbits(bits[:, :width], bitorder = 'little').tobytes()
+
+def _numpy_unpack(np, data, width, count):
+	bits = np.unpackbits(np.frombuffer(data, dtype = np.uint8), count = count*width, bitorder = 'little')
+	full = np.zeros((count, 64), dtype = np.uint8)
+	full[:, :width] = bits.reshape(count, width)
+	return array('Q', np.packbits(full, bitorder = 'little').view('<u8').astype(np.uint64).tobytes())
+
+#words as a packed bitstream without the header, OverflowError if one doesn't fit in width
+def pack_bits(words, width = WORD_BITS):
+	_check_width(width)
+	if len(words) == 0:
+		return b""
+	if max(words) >> width:
+		raise OverflowError("Word wider than {} bits".format(width))
+	np = _numpy() if len(words) >= NUMPY_MIN_WORDS else None
+	if np is None:
+		return _python_pack(words, width)
+	if isinstance(words, array) and words.typecode == 'Q':
+		w = np.frombuffer(words, dtype = np.uint64)
+	else:
+		w = np.asarray(words, dtype = np.uint64)
+	return _numpy_pack(np, w, width)
+
+#count words of width bits from a packed bitstream, the inverse of pack_bits
+def unpack_bits(data, width, count):
+	_check_width(width)
+	if len(data) < (count*width + 7)//8:
+		raise BadPackedStream("{} words of {} bits need {} bytes, got {}".format(
+			count, width, (count*width + 7)//8, len(data)
+		))
+	np = _numpy() if count >= NUMPY_MIN_WORDS else None
+	if np is None:
+		return _python_unpack(data, width, count)
+	return _numpy_unpack(np, data, width, count)
+
+#header plus bitstream, what a packed .bin holds
+def pack_stream(words, width = WORD_BITS):
+	_check_width(width)
+	return PACKED_MAGIC + bytes([width]) + len(words).to_bytes(8, 'little') + pack_bits(words, width)
+
+#(width, words) of a packed .bin
+def unpack_stream(data):
+	if len(data) < PACKED_HEADER_BYTES or data[:len(PACKED_MAGIC)] != PACKED_MAGIC:
+		raise BadPackedStream()
+	width = data[len(PACKED_MAGIC)]
+	count = int.from_bytes(data[len(PACKED_MAGIC) + 1:PACKED_HEADER_BYTES], 'little')
+	return width, unpack_bits(memoryview(data)[PACKED_HEADER_BYTES:], width, count)
+
+#words of a packed .bin, the whole file in one read
+def read_stream(path):
+	with open(path, "rb") as f:
+		return unpack_stream(f.read())[1]
+
+def is_packed(data):
+	return data[:len(PACKED_MAGIC)] == PACKED_MAGIC
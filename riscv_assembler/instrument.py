@@ -0,0 +1,86 @@
+import time
+
+__all__ = ['Stats']
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#opt in instrumentation, pass one to AssemblyConverter/ProjectConverter
+#with stats=Stats(). Records wall time per stage and plain counters:
+#	times: read, encode, render, write (+ cache, pool for projects)
+#	counters: lines_read, lines_code, lines_skipped, instr_<format>,
+#	          bytes_written, files, files_failed
+#callback, if given, gets as_dict() after every convert
+class Stats:
+
+	def __init__(self, callback = None):
+		self.callback = callback
+		self.times = {}
+		self.counters = {}
+
+	def __str__(self):
+		return "Stats(times={}, counters={})".format(self.times, self.counters)
+
+	def stage(self, name):
+		return _Stage(self, name)
+
+	def count(self, name, n = 1):
+		self.counters[name] = self.counters.get(name, 0) + n
+
+	#add the numbers of another Stats (or its as_dict()), e.g. from a worker process
+	def merge(self, other):
+		if isinstance(other, Stats):
+			other = other.as_dict()
+		for name, t in other["times"].items():
+			self.times[name] = self.times.get(name, 0.0) + t
+		for name, n in other["counters"].items():
+			self.count(name, n)
+
+	def as_dict(self):
+		return {"times": dict(self.times), "counters": dict(self.counters)}
+
+	def reset(self):
+		self.times = {}
+		self.counters = {}
+
+	def report(self):
+		if self.callback is not None:
+			self.callback(self.as_dict())
+
+#times one stage into stats, a class rather than contextlib.contextmanager
+#so importing the package doesn't pull in contextlib
+class _Stage:
+	def __init__(self, stats, name):
+		self.stats = stats
+		self.name = name
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+
+	def __exit__(self, *exc):
+		times = self.stats.times
+		times[self.name] = times.get(self.name, 0.0) + time.perf_counter() - self.start
+		return False
+
+#does nothing, contextlib.nullcontext only exists from python 3.7 on
+class _NoStage:
+	def __enter__(self):
+		return None
+
+	def __exit__(self, *exc):
+		return False
+
+_NO_STAGE = _NoStage()
+
+#a stats.stage(name) that costs nothing when stats is None
+def stage(stats, name):
+	if stats is None:
+		return _NO_STAGE
+	return stats.stage(name)
+
+#counts what flows through an iterator of lines
+def counted(stats, name, lines):
+	for line in lines:
+		stats.count(name)
+		yield line
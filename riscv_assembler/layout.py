@@ -0,0 +1,112 @@
+import sys
+
+from .pseudo import PSEUDO
+from .producers import resolve
+
+__all__ = ['layout', 'line_size', 'parse_line', 'symbol_table', 'tokenize', 'BadMemoryOperand']
+
+class BadMemoryOperand( ValueError ):
+	def __init__(self, message = "Memory operand must be the last operand, written offset(base)"):
+		self.message = message
+		super().__init__(self.message)
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#first pass over a source file: keeps the instruction lines, gives every
+#one of them its byte address and collects label -> address in one go,
+#so resolving a branch target is a single dict lookup. Every line is
+#tokenized once here, code holds the tokens of the instruction lines
+
+#one token is a run of anything but blanks, commas and parens, so
+#"sw s0, 0(sp)" gives sw s0 0 sp. A "#" starts a comment running to the
+#end of the line. Built from str methods only, every step is one C level
+#scan and it's faster than a compiled regex while keeping re out of the import
+def tokenize(line):
+	return line.partition("#")[0].replace(",", " ").replace("(", " ").replace(")", " ").split()
+
+#number of words a source line assembles to, pseudo instructions
+#are sized by their entry in pseudo.PSEUDO
+def line_size(clean, instrs):
+	if clean[0] not in instrs:
+		return 0
+	entry = PSEUDO.get(clean[0])
+	if entry is None:
+		return 1
+	return entry.size(clean)
+
+#strips comments and leading labels off one source line, returns
+#(labels, tokens of the code or None). The mnemonic is interned, so
+#every line of a file shares one string per mnemonic
+def parse_line(line):
+	clean = tokenize(line)
+
+	#labels, possibly followed by an instruction on the same line
+	start = 0
+	while start < len(clean) and clean[start][-1] == ":":
+		start += 1
+	labels = [x[:-1] for x in clean[:start]]
+	if start > 0:
+		del clean[:start]
+
+	#comment, empty space, .global .text
+	if len(clean) == 0 or clean[0][0] == ".":
+		return labels, None
+	#an offset(base) memory operand ends the line, its base goes first like
+	#every other source register: "sw s0, 8(sp)" gives sw sp s0 8,
+	#"lw s0, 8(sp)" gives lw sp s0 8 and "lw 8(sp)" gives lw sp 8
+	if "(" in line and "(" in line.partition("#")[0]:
+		if len(clean) > 4:
+			raise BadMemoryOperand("Operands left over after offset(base): " + " ".join(clean))
+		if len(clean) > 2:
+			clean.insert(1, clean.pop())
+	clean[0] = sys.intern(clean[0])
+	return labels, clean
+
+#returns (code, line_addr, symbols), the tokens of every directive line
+#(.globl main ...) are appended to directives when it's given.
+#%labels name producers instead of addresses (see producers.py), their
+#references become [N] operands before the code is handed back
+def layout(lines, instrs, directives = None):
+	code = []
+	line_addr = []
+	symbols = {}
+	#code line index -> producer names defined on it
+	defs = {}
+	addr = 0
+
+	for line in lines:
+		labels, clean = parse_line(line)
+		for label in labels:
+			if label[0] == "%":
+				defs.setdefault(len(code), []).append(label[1:])
+			else:
+				symbols[label] = addr
+		if clean is None:
+			if directives is not None:
+				tokens = tokenize(line)[len(labels):]
+				if len(tokens) > 0 and tokens[0][0] == ".":
+					directives.append(tokens)
+			continue
+
+		code.append(clean)
+		line_addr.append(addr)
+		addr += 4*line_size(clean, instrs)
+
+	if len(defs) > 0:
+		resolve(code, line_addr, defs, addr)
+	return code, line_addr, symbols
+
+#label -> address only, for callers that don't want to keep the code around
+def symbol_table(lines, instrs):
+	symbols = {}
+	addr = 0
+	for line in lines:
+		labels, clean = parse_line(line)
+		for label in labels:
+			if label[0] != "%":
+				symbols[label] = addr
+		if clean is not None:
+			addr += 4*line_size(clean, instrs)
+	return symbols
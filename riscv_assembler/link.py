@@ -0,0 +1,84 @@
+from array import array
+from collections import namedtuple
+
+from .encoding import pack_I, pack_SB, pack_U, pack_UJ
+
+__all__ = ['Relocatable', 'Image', 'UnresolvedSymbol', 'DuplicateSymbol', 'exports_of', 'symbol_index', 'link']
+
+class UnresolvedSymbol( ValueError ):
+	def __init__(self, message = "Branch target is not exported by any file of the project"):
+		self.message = message
+		super().__init__(self.message)
+
+class DuplicateSymbol( ValueError ):
+	def __init__(self, message = "Symbol is exported by more than one file"):
+		self.message = message
+		super().__init__(self.message)
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#one assembled file, see AssemblyConverter.relocatable
+#	name: the file, as the project refers to it
+#	words: encoded words, targets in other files left as 0
+#	symbols: label -> address inside the file
+#	exports: labels named by .globl/.global
+#	relocs: (word index, format, symbol, pc) for every target outside the file
+#	digest: sha256 of the source, tells a stale object from a current one
+Relocatable = namedtuple('Relocatable', ['name', 'words', 'symbols', 'exports', 'relocs', 'digest'])
+
+#a linked project: all words, exported symbol -> address, file -> base address
+Image = namedtuple('Image', ['words', 'symbols', 'bases'])
+
+#immediate bits of a format on their own, or'ed into a word assembled with imm 0
+_PATCH = {
+	"I": lambda imm: pack_I(0, 0, 0, imm),
+	"SB": lambda imm: pack_SB(0, 0, 0, 0, imm),
+	"U": lambda imm: pack_U(0, imm),
+	"UJ": lambda imm: pack_UJ(0, imm)
+}
+
+#names exported by the directives of a file, directives being token lists
+def exports_of(directives):
+	names = []
+	for tokens in directives:
+		if tokens[0] in (".globl", ".global"):
+			names.extend(tokens[1:])
+	return names
+
+#exported symbol -> absolute address, files laid out back to back in order.
+#A .globl without a label in the same file is left to the file defining it
+def symbol_index(objects, bases):
+	symbols = {}
+	owner = {}
+	for obj in objects:
+		for name in obj.exports:
+			if name not in obj.symbols:
+				continue
+			if name in symbols:
+				raise DuplicateSymbol("{} is exported by {} and {}".format(name, owner[name], obj.name))
+			symbols[name] = bases[obj.name] + obj.symbols[name]
+			owner[name] = obj.name
+	return symbols
+
+#lays the objects out into one image and patches every cross file target,
+#objects are only read so unchanged ones can be linked again as they are
+def link(objects):
+	bases = {}
+	addr = 0
+	for obj in objects:
+		bases[obj.name] = addr
+		addr += 4*len(obj.words)
+	symbols = symbol_index(objects, bases)
+
+	words = array('Q')
+	for obj in objects:
+		start = len(words)
+		words.extend(obj.words)
+		base = bases[obj.name]
+		for i, fmt, name, pc in obj.relocs:
+			if name not in symbols:
+				raise UnresolvedSymbol("Unresolved symbol in {}: {}".format(obj.name, name))
+			words[start + i] |= _PATCH[fmt](symbols[name] - (base + pc))
+	return Image(words, symbols, bases)
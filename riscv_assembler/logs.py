@@ -0,0 +1,44 @@
+import sys
+
+__all__ = ['getLogger']
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#stands in for logging.getLogger(name) without importing logging up front.
+#If the application never imported logging nobody configured it, so debug
+#and info records would be dropped anyway and are skipped without the import.
+#Warnings and errors always go through logging (its last resort handler
+#prints them to stderr)
+class LazyLogger:
+
+	def __init__(self, name):
+		self.name = name
+		self.__log = None
+
+	def __str__(self):
+		return "LazyLogger(name={})".format(self.name)
+
+	def __logger(self):
+		if self.__log is None:
+			import logging
+			self.__log = logging.getLogger(self.name)
+		return self.__log
+
+	def debug(self, *args, **kw):
+		if "logging" in sys.modules:
+			self.__logger().debug(*args, **kw)
+
+	def info(self, *args, **kw):
+		if "logging" in sys.modules:
+			self.__logger().info(*args, **kw)
+
+	def warning(self, *args, **kw):
+		self.__logger().warning(*args, **kw)
+
+	def error(self, *args, **kw):
+		self.__logger().error(*args, **kw)
+
+def getLogger(name):
+	return LazyLogger(name)
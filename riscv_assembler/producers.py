@@ -0,0 +1,92 @@
+from .encoding import REG_MASK
+
+__all__ = ['ProducerMap', 'ProducerError', 'MAX_DISTANCE', 'resolve', 'too_far']
+
+#farthest producer an [N] operand can name, the 10 bit operand field
+MAX_DISTANCE = REG_MASK
+
+def too_far():
+	return "is more than the {} words back an operand can reach".format(MAX_DISTANCE)
+
+class ProducerError( ValueError ):
+	#every problem of a file at once, problems holds (line, operand, reason)
+	def __init__(self, problems = (), message = None):
+		self.problems = list(problems)
+		if message is None:
+			message = "Producer references could not be resolved:\n" + "\n".join(
+				"\tinstruction {}: {} {}".format(line, operand, reason) if line is not None
+				else "\t{} {}".format(operand, reason)
+				for line, operand, reason in self.problems
+			)
+		self.message = message
+		super().__init__(self.message)
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#symbolic operands: instead of counting how many words back a value was
+#produced, name the producer with a %label and refer to it by that name
+#
+#	%a:   addi [0] 1
+#	%b:   addi [0] 2
+#	      nop
+#	%sum: add %a %b        -> add [3] [2]
+#	      sw %sum %a 0     -> sw [1] [4] 0
+#
+#a name stands for its latest definition above the reference, so it can be
+#defined again (%i: addi %i 1 reads the old %i and then becomes the new
+#one). The producer of a multi word line is its last word, a reference
+#counts from the first word of its line. Names are resolved in the same
+#pass that lays the code out, one dict lookup per reference
+class ProducerMap:
+
+	def __init__(self):
+		#name -> word index of its latest producer
+		self.last = {}
+		self.problems = []
+
+	def __str__(self):
+		return "ProducerMap(names={}, problems={})".format(len(self.last), len(self.problems))
+
+	def define(self, name, pos):
+		self.last[name] = pos
+
+	#rewrite the %name operands of the line at word pos to [N] in place,
+	#problems are collected rather than raised. [N] written by hand are
+	#range checked here too, so one report covers the whole file
+	def resolve(self, clean, line, pos):
+		for i in range(1, len(clean)):
+			x = clean[i]
+			if x[0] == "%":
+				at = self.last.get(x[1:])
+				if at is None:
+					self.problems.append((line, x, "has no producer above it"))
+					continue
+				dist = pos - at
+				if dist > MAX_DISTANCE:
+					self.problems.append((line, x, "is {} words back, more than the {} an operand can reach".format(dist, MAX_DISTANCE)))
+					continue
+				clean[i] = "[{}]".format(dist)
+			elif x[0] == "[" and x[-1] == "]" and x[1:-1].isdigit() and int(x[1:-1]) > MAX_DISTANCE:
+				self.problems.append((line, x, too_far()))
+
+	def check(self):
+		if len(self.problems) > 0:
+			raise ProducerError(self.problems)
+
+#resolve the producer references of laid out code, defs maps the index of a
+#code line to the names defined on it and end is the address after the last
+#line. Raises ProducerError listing every reference that didn't resolve
+def resolve(code, line_addr, defs, end):
+	producers = ProducerMap()
+	for i in range(len(code)):
+		pos = line_addr[i] >> 2
+		producers.resolve(code[i], i, pos)
+		names = defs.get(i)
+		if names is not None:
+			last = (line_addr[i + 1] if i + 1 < len(code) else end) - 4
+			for name in names:
+				producers.define(name, last >> 2)
+	producers.check()
+	return producers
@@ -1,35 +1,99 @@
-from convert import AssemblyConverter
+from .convert import AssemblyConverter, CACHE_SIZE
+from .instrument import Stats, stage
+from .link import link as link_objects
+from .buffer import InstructionBuffer
+from .encoding import WORD_BITS, WORD_BYTES, write_image, pack_stream
+from . import logs
 import os
 
 __all__ = ['ProjectConverter']
 
+log = logs.getLogger(__name__)
+
 class NoAssemblyDirectory( Exception ):
 	def __init__(self, message = "The provided directory has no Assembly (.s) files in it"):
 		self.message = message
 		super().__init__(self.message)
 
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#every worker process gets its own converter, AssemblyConverter keeps
+#per file state so one instance can't be shared between files in flight.
+#Made by the first task a worker runs, from the options every task carries
+#(ProcessPoolExecutor only takes an initializer from python 3.7 on)
+_worker = None
+_worker_options = None
+
+def _get_worker(options, instrument):
+	global _worker, _worker_options
+	if _worker is None or _worker_options != (options, instrument):
+		_worker = AssemblyConverter(**options)
+		if instrument:
+			_worker.setStats(Stats())
+		_worker_options = (options, instrument)
+	return _worker
+
+#task is (options, instrument, path), returns (result, words, error message,
+#stats of this file or None), exceptions stay in the worker
+def _worker_convert(task):
+	options, instrument, path = task
+	worker = _get_worker(options, instrument)
+	stats = worker.getStats()
+	if stats is not None:
+		stats.reset()
+	try:
+		res = worker.convert(path), worker.words, None
+	except Exception as e:
+		res = None, None, "{}: {}".format(type(e).__name__, e)
+	return res + (None if stats is None else stats.as_dict(),)
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
 class ProjectConverter:
 
-	def __init__(self, root = '', output_type='b', nibble = False, hexMode = False):
+	def __init__(self, root = '', output_type='b', nibble = False, hexMode = False, verbose = False, workers = 1,
+			cache_dir = None, stats = None, cache_size = CACHE_SIZE, sink = None, word_bytes = WORD_BYTES,
+			byteorder = 'little', packed = None):
 		self.root = root #should be relative path from python script using pkg
 		if root == '':
 			self.root = os.getcwd()
 
-		self.converter = AssemblyConverter(output_type=output_type, nibble=nibble, hexMode=hexMode)
+		#one converter for every file, so its encode cache stays warm across the project
+		self.converter = AssemblyConverter(output_type=output_type, nibble=nibble, hexMode=hexMode, verbose=verbose,
+			cache_size=cache_size, sink=sink, word_bytes=word_bytes, byteorder=byteorder, packed=packed)
+		#instrument.Stats for the whole project, the converter fills its own
+		#(callback free) copy that is folded in after every convert()
+		self.stats = None
+		self.setStats(stats)
 
-		self.files = [x for x in os.listdir(self.root) if x[-2:] == '.s'] #need to raise error just in case
+		self.files = sorted([x for x in os.listdir(self.root) if x[-2:] == '.s']) #need to raise error just in case
 		if len(self.files) == 0:
 			raise NoAssemblyDirectory()
 		#take only .s files
 
 		self.instr = {}
 		self.failed = []
+		#number of processes used by convert(), 1 converts in this process
+		self.workers = workers
+		#incremental builds, unchanged files are loaded from the cache
+		self.cache = None
+		if cache_dir is not None:
+			from .build_cache import BuildCache
+			self.cache = BuildCache(cache_dir)
+		#f -> link.Relocatable, kept between link() calls so only
+		#changed files are assembled again
+		self.objects = {}
+		self.image = None
 ####--------------------------------------------------------------------------------------------------------
 	def __str__(self):
-		return "**\n  	ProjectConverter(output_type={}, nibble={}, hexmode={})\n\t- root: {}\n\t- Files: {}\n**".format(
+		return "**\n  	ProjectConverter(output_type={}, nibble={}, hexmode={}, workers={})\n\t- root: {}\n\t- Files: {}\n**".format(
 			self.converter.output_type, self.converter.nibble,
-			self.converter.hexMode, self.root,
-			self.files
+			self.converter.hexMode, self.workers,
+			self.root, self.files
 		)
 
 	def __len__(self):
@@ -51,6 +115,46 @@ class ProjectConverter:
 	def setHex(self, x):
 		self.converter.setHex(x)
 
+	def setVerbose(self, x):
+		self.converter.setVerbose(x)
+
+	#send the "b"/"t" outputs of every file to a sinks.Sink, flushed after
+	#every convert(), closing it is up to the caller
+	def setSink(self, x):
+		self.converter.setSink(x)
+
+	def getSink(self):
+		return self.converter.getSink()
+
+	#.bin layout of every file and of link(filename = ...), see AssemblyConverter
+	def setWordBytes(self, x):
+		self.converter.setWordBytes(x)
+
+	def getWordBytes(self):
+		return self.converter.getWordBytes()
+
+	def setByteorder(self, x):
+		self.converter.setByteorder(x)
+
+	def getByteorder(self):
+		return self.converter.getByteorder()
+
+	def setPacked(self, x):
+		self.converter.setPacked(x)
+
+	def getPacked(self):
+		return self.converter.getPacked()
+
+	def setWorkers(self, x):
+		self.workers = x
+
+	def setStats(self, x):
+		self.stats = x
+		self.converter.setStats(None if x is None else Stats())
+
+	def getStats(self):
+		return self.stats
+
 	def getFiles(self):
 		return self.files
 
@@ -60,6 +164,18 @@ class ProjectConverter:
 	def getFailedConvert(self):
 		return self.failed
 
+	#exported symbol -> address of the last link()
+	def getSymbols(self):
+		if self.image is None:
+			return {}
+		return self.image.symbols
+
+	#cache hit/miss counters, None without a cache
+	def getCacheStats(self):
+		if self.cache is None:
+			return None
+		return self.cache.stats()
+
 	def addDict(self, f, x):
 		if x != None:
 			self.instr[f] = x
@@ -68,18 +184,152 @@ class ProjectConverter:
 	def convert(self, files = []):
 		self.failed = []
 		if len(files) == 0: files = self.files
-		if self.getOutputType() == 'r':
-			g = [self.addDict(f, self.catch_convert(f)) for f in files]
+
+		#f -> (result, words, error), filled from the cache first
+		results = {}
+		keys = {}
+		if self.cache is not None:
+			#verbose/use_mmap/cache_size don't change what ends up in the outputs
+			options = self.__options()
+			del options["verbose"], options["use_mmap"], options["cache_size"]
+			with stage(self.stats, "cache"):
+				for f in files:
+					with open(self.root + '/' + f, "rb") as src:
+						keys[f] = self.cache.key(src.read(), options)
+					words = self.cache.get(keys[f])
+					if words is not None:
+						results[f] = self.__emit(f, words)
+
+		dirty = [f for f in files if f not in results]
+		if self.workers > 1 and len(dirty) > 1:
+			#wall time of the pool, the worker stage times add up per process
+			with stage(self.stats, "pool"):
+				results.update(self.__parallel_convert(dirty))
+		else:
+			for f in dirty:
+				results[f] = self.__convert_one(f)
+
+		#merged in file order, so instr and failed don't depend on
+		#which file was cached or which worker finished first
+		for f in files:
+			res, words, err = results[f]
+			if err is not None:
+				log.warning("File %s assembly failed: %s", f, err)
+				self.failed.append(f)
+				continue
+			if f in keys and f in dirty:
+				self.cache.put(keys[f], words)
+			self.addDict(f, res)
+
+		if self.getSink() is not None:
+			with stage(self.stats, "write"):
+				self.getSink().flush()
+
+		if self.stats is not None:
+			self.stats.merge(self.converter.getStats())
+			self.converter.getStats().reset()
+			self.stats.count("files", len(files))
+			self.stats.count("files_cached", len(files) - len(dirty))
+			self.stats.count("files_failed", len(self.failed))
+			self.stats.report()
+
+		if "r" in self.getOutputType():
 			return self.instr
-		no_ret = [catch_convert(f) for f in files]
 
 	def catch_convert(self,f):
-		try:
-			return self.converter.convert(self.root + '/' + f)
-		except:
-			print("File " + f + " assembly failed")
+		res, words, err = self.__convert_one(f)
+		if err is not None:
+			log.warning("File %s assembly failed: %s", f, err)
 			self.failed.append(f)
-	
+		return res
+
+	def __convert_one(self, f):
+		try:
+			return self.converter.convert(self.root + '/' + f), self.converter.words, None
+		except Exception as e:
+			log.debug("File %s assembly failed", f, exc_info = self.converter.verbose)
+			return None, None, "{}: {}".format(type(e).__name__, e)
+
+	def __emit(self, f, words):
+		try:
+			return self.converter.emit(self.root + '/' + f, words), words, None
+		except Exception as e:
+			return None, None, "{}: {}".format(type(e).__name__, e)
+
+	#converter options for the worker processes
+	def __options(self):
+		return {
+			"output_type": self.converter.output_type,
+			"nibble": self.converter.nibble,
+			"hexMode": self.converter.hexMode,
+			"verbose": self.converter.verbose,
+			"word_bytes": self.converter.word_bytes,
+			"byteorder": self.converter.byteorder,
+			"use_mmap": self.converter.use_mmap,
+			"packed": self.converter.packed,
+			"cache_size": self.converter.cache_size
+		}
+
+	def __parallel_convert(self, files):
+		#imported here, sequential builds never pay for it
+		from concurrent.futures import ProcessPoolExecutor
+		paths = [self.root + '/' + f for f in files]
+		results = {}
+		options = self.__options()
+		sink = self.getSink()
+		if sink is not None:
+			#a sink lives in this process, the workers only encode
+			options["output_type"] = "r"
+		instrument = self.stats is not None
+		with ProcessPoolExecutor(max_workers = self.workers) as pool:
+			tasks = [(options, instrument, p) for p in paths]
+			for f, (res, words, err, stats) in zip(files, pool.map(_worker_convert, tasks)):
+				if stats is not None:
+					self.stats.merge(stats)
+				results[f] = res, words, err
+		if sink is not None:
+			for f in files:
+				if results[f][2] is None:
+					results[f] = self.__emit(f, results[f][1])
+		return results
+
+	#assemble files into relocatable objects, a file whose source is unchanged
+	#since its object was made keeps it. Returns the files assembled again
+	def assemble(self, files = []):
+		import hashlib
+		if len(files) == 0: files = self.files
+		assembled = []
+		for f in files:
+			obj = self.objects.get(f)
+			if obj is not None:
+				with open(self.root + '/' + f, "rb") as src:
+					if hashlib.sha256(src.read()).hexdigest() == obj.digest:
+						continue
+			self.objects[f] = self.converter.relocatable(self.root + '/' + f, f)
+			assembled.append(f)
+		if self.stats is not None:
+			self.stats.count("files_assembled", len(assembled))
+		return assembled
+
+	#link files, in the given order, into one image with every cross file
+	#jump/branch patched. Written to filename as a .bin when it's given
+	def link(self, files = [], filename = None):
+		if len(files) == 0: files = self.files
+		self.assemble(files)
+		with stage(self.stats, "link"):
+			self.image = link_objects([self.objects[f] for f in files])
+		if filename is not None:
+			with stage(self.stats, "write"):
+				if self.converter.packed is not None:
+					with open(filename, "wb") as f:
+						f.write(pack_stream(self.image.words, self.converter.packed))
+				else:
+					write_image(
+						filename, self.image.words, self.converter.word_bytes,
+						self.converter.byteorder, self.converter.use_mmap
+					)
+		return InstructionBuffer(self.image.words, WORD_BITS, self.converter.hexMode, self.converter.nibble)
+
 	##-----------PROJECT ASSEMBLY PROTOCOLS-----------##
 
 	# - main idea is to track variables/funcs/filenames through diff files
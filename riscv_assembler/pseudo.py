@@ -0,0 +1,102 @@
+from collections import namedtuple
+
+__all__ = ['PSEUDO', 'Pseudo', 'expand', 'size', 'split_imm', 'fits_imm12']
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#pseudo instructions as data: every mnemonic has a size function telling how
+#many words a line expands to and, per size, the base instructions it expands
+#into. Templates are source lines, {n} is operand n of the pseudo line and
+#{name} a field computed from the line by fields, like the {hi}/{lo} halves
+#of an immediate split for lui + addi. layout() sizes lines with size() and
+#the converter encodes whatever expand() returns, so addresses and encodings
+#can't disagree
+Pseudo = namedtuple('Pseudo', ['size', 'templates', 'fields'])
+
+def fits_imm12(x):
+	return -2**11 <= x < 2**11
+
+#upper 20 bits for lui and the signed 12 bit rest for addi, hi is rounded so
+#that (hi << 12) + lo == imm with lo in the addi range
+def split_imm(imm):
+	hi = (imm + 0x800) >> 12
+	return hi, imm - (hi << 12)
+
+#li takes one addi when the immediate fits, lui + addi otherwise. An
+#immediate that isn't a number is left to the addi encoder to reject
+def _li_size(clean):
+	try:
+		return 1 if fits_imm12(int(clean[2])) else 2
+	except (ValueError, IndexError):
+		return 1
+
+def _li_fields(clean):
+	hi, lo = split_imm(int(clean[2]))
+	return {"hi": str(hi), "lo": str(lo)}
+
+#a template line as a tuple, ints index the pseudo line's tokens and
+#"{name}" tokens stay strings looked up in the fields of the line
+def _compile(text):
+	tokens = []
+	for x in text.split():
+		if x[0] == "{" and x[1:-1].isdigit():
+			tokens.append(int(x[1:-1]))
+		else:
+			tokens.append(x)
+	return tuple(tokens)
+
+def _fixed(*texts):
+	n = len(texts)
+	return Pseudo(lambda clean: n, {n: [_compile(x) for x in texts]}, None)
+
+PSEUDO = {
+	"nop": _fixed("addi x0 0"),
+	"mv": _fixed("addi {1} 0"),
+	"not": _fixed("xori {1} -1"),
+	"neg": _fixed("sub x0 {1}"),
+	"seqz": _fixed("sltiu {1} 1"),
+	"snez": _fixed("sltu x0 {1}"),
+	"la": _fixed("auipc {1}"),
+	"j": _fixed("jal {1}"),
+	"jr": _fixed("jalr {1} 0"),
+	"ret": _fixed("jalr x1 0"),
+	"bgt": _fixed("blt {2} {1} {3}"),
+	"ble": _fixed("bge {2} {1} {3}"),
+	"beqz": _fixed("beq {1} x0 {2}"),
+	"bnez": _fixed("bne {1} x0 {2}"),
+	#[1] is the lui right before the addi
+	"li": Pseudo(_li_size, {
+		1: [_compile("addi x0 {2}")],
+		2: [_compile("lui {hi}"), _compile("addi [1] {lo}")]
+	}, _li_fields)
+}
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#words the pseudo line clean expands to
+def size(clean):
+	return PSEUDO[clean[0]].size(clean)
+
+#token lists of the base instructions of the pseudo line clean
+def expand(clean):
+	entry = PSEUDO[clean[0]]
+	templates = entry.templates[entry.size(clean)]
+	named = None
+	lines = []
+	for template in templates:
+		tokens = []
+		for x in template:
+			if type(x) is int:
+				tokens.append(clean[x])
+			elif x[0] == "{":
+				if named is None:
+					named = entry.fields(clean)
+				tokens.append(named[x[1:-1]])
+			else:
+				tokens.append(x)
+		lines.append(tokens)
+	return lines
@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+
+from .convert import AssemblyConverter
+from .buffer import InstructionBuffer
+from .encoding import WIDE_BITS
+from .tables import load_tables
+from . import logs
+
+__all__ = ['ConverterPool', 'handle', 'serve_stdio', 'serve_socket', 'main']
+
+log = logs.getLogger(__name__)
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#long lived assembler process, the interpreter start, the imports and the
+#table parse are paid once and every request only pays for the encoding.
+#One json object per line in, one per line out:
+#
+#	{"id": 1, "file": "a.s"}                         -> {"id": 1, "ok": true, "file": "a.s", "instructions": [...]}
+#	{"id": 2, "files": ["a.s", "b.s"], "hexMode": true} -> {"id": 2, "ok": true, "results": [{...}, {...}]}
+#	{"id": 3, "source": "addi x1 5\n..."}              -> {"id": 3, "ok": true, "instructions": [...]}
+#	{"op": "ping"} / {"op": "stats"} / {"op": "shutdown"}
+#
+#converter options (output_type, hexMode, nibble, word_bytes, byteorder, packed) ride
+#along with the request, output_type defaults to "r" and "p" is read as "r",
+#the text comes back in the reply rather than being printed into the reply
+#stream. "b"/"t" outputs are written relative to the server's working
+#directory, like convert() does.
+#source is assembled in memory and never touches the disk. Instructions come
+#back as convert() renders them, bit strings padded to 64 bits, for files
+#and sources alike
+
+#request keys passed on to AssemblyConverter
+OPTIONS = ("output_type", "hexMode", "nibble", "word_bytes", "byteorder", "packed")
+
+#idle converters per option set, a converter keeps per file state so a
+#request takes one out for as long as it runs
+class ConverterPool:
+
+	def __init__(self):
+		self.__free = {}
+		self.__lock = threading.Lock()
+		self.created = 0
+
+	def __str__(self):
+		return "ConverterPool(created={})".format(self.created)
+
+	def acquire(self, options):
+		key = tuple(sorted(options.items()))
+		with self.__lock:
+			free = self.__free.setdefault(key, [])
+			if len(free) > 0:
+				return free.pop()
+			self.created += 1
+		return AssemblyConverter(**options)
+
+	def release(self, options, converter):
+		key = tuple(sorted(options.items()))
+		with self.__lock:
+			self.__free[key].append(converter)
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+def _assemble(converter, path):
+	try:
+		res = converter.convert(path)
+	except Exception as e:
+		return {"file": path, "ok": False, "error": "{}: {}".format(type(e).__name__, e)}
+	out = {"file": path, "ok": True, "count": len(converter.words)}
+	if res is not None:
+		out["instructions"] = res.as_text()
+	return out
+
+def _assemble_source(converter, source):
+	try:
+		res = converter.convert_string(source)
+	except Exception as e:
+		return {"ok": False, "error": "{}: {}".format(type(e).__name__, e)}
+	#rendered like convert() renders a file, so a program reads the same sent either way
+	text = InstructionBuffer(res.words, WIDE_BITS, converter.hexMode, converter.nibble).as_text()
+	return {"ok": True, "count": len(res), "instructions": text}
+
+#answer one request, never raises
+def handle(request, pool):
+	if not isinstance(request, dict):
+		return {"ok": False, "error": "request must be a json object"}
+	op = request.get("op", "assemble")
+	reply = {"ok": True}
+	if "id" in request:
+		reply["id"] = request["id"]
+
+	if op == "ping":
+		return reply
+	if op == "stats":
+		reply["converters"] = pool.created
+		return reply
+	if op == "shutdown":
+		return reply
+	if op != "assemble":
+		reply.update(ok = False, error = "unknown op: {}".format(op))
+		return reply
+
+	options = {"output_type": "r"}
+	options.update((k, request[k]) for k in OPTIONS if k in request)
+	#"p" would print into the stream carrying the replies
+	if isinstance(options["output_type"], str) and "p" in options["output_type"]:
+		options["output_type"] = options["output_type"].replace("p", "")
+		if "r" not in options["output_type"]:
+			options["output_type"] += "r"
+	try:
+		converter = pool.acquire(options)
+	except Exception as e:
+		reply.update(ok = False, error = "{}: {}".format(type(e).__name__, e))
+		return reply
+
+	try:
+		if "files" in request:
+			reply["results"] = [_assemble(converter, f) for f in request["files"]]
+		elif "file" in request:
+			reply.update(_assemble(converter, request["file"]))
+		elif "source" in request:
+			reply.update(_assemble_source(converter, request["source"]))
+		else:
+			reply.update(ok = False, error = "request has neither file, files nor source")
+	finally:
+		pool.release(options, converter)
+	return reply
+
+#read requests from lines, write replies to out until eof or shutdown
+def _serve(lines, out, pool):
+	for line in lines:
+		line = line.strip()
+		if line == "":
+			continue
+		try:
+			request = json.loads(line)
+		except ValueError as e:
+			request = None
+			reply = {"ok": False, "error": "bad json: {}".format(e)}
+		else:
+			reply = handle(request, pool)
+		out.write(json.dumps(reply) + "\n")
+		out.flush()
+		if isinstance(request, dict) and request.get("op") == "shutdown":
+			return True
+	return False
+
+def serve_stdio(stdin = None, stdout = None, pool = None):
+	load_tables()
+	_serve(stdin or sys.stdin, stdout or sys.stdout, pool or ConverterPool())
+
+class _Handler(socketserver.StreamRequestHandler):
+	def handle(self):
+		out = _TextOut(self.wfile)
+		lines = (x.decode() for x in self.rfile)
+		if _serve(lines, out, self.server.pool):
+			threading.Thread(target = self.server.shutdown, daemon = True).start()
+
+class _TextOut:
+	def __init__(self, f):
+		self.f = f
+
+	def write(self, x):
+		self.f.write(x.encode())
+
+	def flush(self):
+		self.f.flush()
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+	daemon_threads = True
+
+#serve every connection on the unix socket at path in its own thread,
+#the converters are shared through one pool
+def serve_socket(path, pool = None):
+	load_tables()
+	if os.path.exists(path):
+		os.remove(path)
+	with _Server(path, _Handler) as server:
+		server.pool = pool or ConverterPool()
+		log.info("Listening on %s", path)
+		try:
+			server.serve_forever()
+		finally:
+			os.remove(path)
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Assemble .s files for many requests from one warm process")
+	parser.add_argument("--socket", help = "listen on this unix socket instead of stdin/stdout")
+	parser.add_argument("--verbose", action = "store_true")
+	args = parser.parse_args(argv)
+
+	if args.verbose:
+		import logging
+		logging.basicConfig(level = logging.INFO, stream = sys.stderr)
+	if args.socket:
+		serve_socket(args.socket)
+	else:
+		serve_stdio()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,198 @@
+from abc import ABC, abstractmethod
+import os
+
+__all__ = ['Sink', 'DirectorySink', 'ArchiveSink', 'ImageSink', 'MemorySink', 'read_image']
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#where converter outputs end up. Outputs are named by their path relative to
+#the output root, the way convert() lays them out on disk ("test0/bin/test0.bin",
+#"test0/txt/test0.txt"). write() only queues, queued outputs go out together
+#once buffer_size bytes are waiting and on flush()/close(), so a project build
+#does a few large writes instead of one small one per file.
+#
+#	with ArchiveSink("build.zip") as sink:
+#		ProjectConverter(root = "src", output_type = "bt", sink = sink).convert()
+
+#bytes queued before a sink writes them out
+BUFFER_SIZE = 1 << 20
+
+class Sink(ABC):
+
+	def __init__(self, buffer_size = BUFFER_SIZE):
+		self.buffer_size = buffer_size
+		self.__pending = []
+		self.__pending_bytes = 0
+		self.closed = False
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def write(self, name, data):
+		self.__pending.append((name, data))
+		self.__pending_bytes += len(data)
+		if self.__pending_bytes >= self.buffer_size:
+			self.flush()
+
+	def flush(self):
+		if len(self.__pending) > 0:
+			pending = self.__pending
+			self.__pending = []
+			self.__pending_bytes = 0
+			self._write_batch(pending)
+
+	def close(self):
+		if not self.closed:
+			self.flush()
+			self._close()
+			self.closed = True
+
+	#backends: write the (name, data) pairs out, release what they hold
+	@abstractmethod
+	def _write_batch(self, pending):
+		pass
+
+	def _close(self):
+		pass
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#one file per output under root, what convert() does without a sink
+class DirectorySink(Sink):
+
+	def __init__(self, root = ".", buffer_size = BUFFER_SIZE):
+		super().__init__(buffer_size)
+		self.root = root
+		#directories already made, one makedirs per directory not per file
+		self.__dirs = set()
+
+	def __str__(self):
+		return "DirectorySink(root={})".format(self.root)
+
+	def _write_batch(self, pending):
+		for name, data in pending:
+			path = os.path.join(self.root, name)
+			folder = os.path.dirname(path)
+			if folder not in self.__dirs:
+				os.makedirs(folder, exist_ok = True)
+				self.__dirs.add(folder)
+			with open(path, "wb") as f:
+				f.write(data)
+
+#every output as a member of one tar or zip file, picked by the extension of
+#path (.zip, .tar, .tar.gz/.tgz) unless kind ("zip", "tar", "tar:gz") says so
+class ArchiveSink(Sink):
+
+	def __init__(self, path, kind = None, buffer_size = BUFFER_SIZE):
+		super().__init__(buffer_size)
+		self.path = path
+		if kind is None:
+			if path.endswith(".zip"):
+				kind = "zip"
+			elif path.endswith(".tar.gz") or path.endswith(".tgz"):
+				kind = "tar:gz"
+			else:
+				kind = "tar"
+		if kind not in ("zip", "tar", "tar:gz"):
+			raise ValueError("Unknown archive kind: " + kind)
+		self.kind = kind
+		self.__archive = None
+
+	def __str__(self):
+		return "ArchiveSink(path={}, kind={})".format(self.path, self.kind)
+
+	#opened on the first batch, tarfile/zipfile are only imported by builds that use them
+	def __open(self):
+		if self.kind == "zip":
+			import zipfile
+			return zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED)
+		import tarfile
+		return tarfile.open(self.path, "w:gz" if self.kind == "tar:gz" else "w")
+
+	def _write_batch(self, pending):
+		if self.__archive is None:
+			self.__archive = self.__open()
+		if self.kind == "zip":
+			for name, data in pending:
+				self.__archive.writestr(name, data)
+			return
+
+		import io
+		import tarfile
+		for name, data in pending:
+			info = tarfile.TarInfo(name)
+			info.size = len(data)
+			self.__archive.addfile(info, io.BytesIO(data))
+
+	def _close(self):
+		if self.__archive is None:
+			self.__archive = self.__open()
+		self.__archive.close()
+
+#every output back to back in the single file path, with an index of where
+#each one starts written to path + ".index": one "offset length name" line
+#per output. read_image() gets them back
+class ImageSink(Sink):
+
+	def __init__(self, path, buffer_size = BUFFER_SIZE):
+		super().__init__(buffer_size)
+		self.path = path
+		#name -> (offset, length)
+		self.index = {}
+		self.__offset = 0
+		self.__file = None
+
+	def __str__(self):
+		return "ImageSink(path={}, outputs={})".format(self.path, len(self.index))
+
+	#the whole batch goes out in one write
+	def _write_batch(self, pending):
+		if self.__file is None:
+			self.__file = open(self.path, "wb")
+		for name, data in pending:
+			self.index[name] = (self.__offset, len(data))
+			self.__offset += len(data)
+		self.__file.write(b"".join(data for name, data in pending))
+
+	def _close(self):
+		if self.__file is None:
+			self.__file = open(self.path, "wb")
+		self.__file.close()
+		with open(self.path + ".index", "w") as f:
+			for name, (offset, length) in self.index.items():
+				f.write("{} {} {}\n".format(offset, length, name))
+
+#name -> bytes of an image written by ImageSink, read in one go
+def read_image(path):
+	with open(path, "rb") as f:
+		data = f.read()
+	outputs = {}
+	with open(path + ".index", "r") as f:
+		for line in f:
+			offset, length, name = line.rstrip("\n").split(" ", 2)
+			offset, length = int(offset), int(length)
+			outputs[name] = data[offset:offset + length]
+	return outputs
+
+#outputs kept in the dict files, name -> bytes, nothing goes to disk
+class MemorySink(Sink):
+
+	def __init__(self):
+		super().__init__(0)
+		self.files = {}
+
+	def __str__(self):
+		return "MemorySink(outputs={})".format(len(self.files))
+
+	def write(self, name, data):
+		self.files[name] = data
+
+	def _write_batch(self, pending):
+		self.files.update(pending)
@@ -0,0 +1,154 @@
+from collections import namedtuple
+import os
+from types import MappingProxyType
+#_thread rather than threading, the lock is all that's needed and threading
+#is a noticeable share of the import
+import _thread
+
+from .encoding import REG_MASK, field_ints
+from .producers import MAX_DISTANCE, ProducerError, too_far
+
+__all__ = ['RegisterMap', 'Tables', 'load_tables', 'reload_tables', 'write_module']
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+class RegisterMap(dict):
+	def __init__(self,*arg,**kw):
+		super(RegisterMap, self).__init__(*arg, **kw)
+
+	def __getitem__(self, elem):
+		if elem[0] == '[' and elem[-1] == ']':
+			dest_num = int(elem[1:-1])
+			#same limit and error as the producer references
+			if dest_num > MAX_DISTANCE:
+				raise ProducerError([(None, elem, too_far())])
+			return dest_num
+		else:
+			return super().get(elem)
+
+#r_map: register name -> register number
+#instr_data: mnemonic -> (opcode, f3, f7) bit strings as written in instr_data.dat
+#instr_fields: mnemonic -> (opcode, f3, f7) as ints
+#digest: sha256 of both .dat files, changes whenever the tables do
+#operands: operand token -> register number for every register name and
+#	every [N] distance that fits the 10 bit field, so decoding an operand
+#	is one dict lookup. Anything else goes through r_map
+Tables = namedtuple('Tables', ['r_map', 'instr_data', 'instr_fields', 'digest', 'operands'])
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+#tables precompiled from the .dat files at build time (setup.py build_py,
+#or write_module by hand), importing them skips the text parse
+try:
+	from . import _tables_data
+except ImportError:
+	_tables_data = None
+
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+#-----------------------------------------------------------------------------------------
+
+#the .dat files are parsed once per process, every converter shares
+#the same read only mappings
+_tables = None
+_lock = _thread.allocate_lock()
+
+def _read(data_dir):
+	with open(os.path.join(data_dir, "reg_map.dat"), "r") as f:
+		reg_text = f.read()
+	with open(os.path.join(data_dir, "instr_data.dat"), "r") as f:
+		instr_text = f.read()
+	return reg_text, instr_text
+
+#size and modification time of both files, what the precompiled module
+#is checked against without reading them
+def _stat(data_dir):
+	return tuple(
+		(st.st_size, st.st_mtime_ns) for st in (
+			os.stat(os.path.join(data_dir, "reg_map.dat")),
+			os.stat(os.path.join(data_dir, "instr_data.dat"))
+		)
+	)
+
+def _digest(reg_text, instr_text):
+	import hashlib
+	return hashlib.sha256((reg_text + instr_text).encode()).hexdigest()
+
+#plain dicts of both files: (r_map, instr_data, instr_fields, digest, operands)
+def _parse_text(reg_text, instr_text):
+	r_p = {}
+	for line in reg_text.splitlines():
+		elems = line.split(" ")
+		if len(elems) > 1:
+			r_p[elems[0]] = int(elems[1].strip()[1::])
+
+	i_data = {}
+	for line in instr_text.splitlines():
+		elems = line.split(" ")
+		if len(elems) > 1:
+			i_data[elems[0]] = tuple(elems[1::])
+
+	operands = {"[{}]".format(n): n for n in range(REG_MASK + 1)}
+	for name, n in r_p.items():
+		operands[name] = n & REG_MASK
+
+	return r_p, i_data, field_ints(i_data), _digest(reg_text, instr_text), operands
+
+def _freeze(r_p, i_data, i_fields, digest, operands):
+	return Tables(
+		MappingProxyType(RegisterMap(r_p)),
+		MappingProxyType(i_data),
+		MappingProxyType(i_fields),
+		digest,
+		MappingProxyType(operands)
+	)
+
+#the precompiled module is used while the .dat files are the ones it was
+#written from. One written by build_py comes with the package's own files,
+#an install copies those and changes their mtime, so it is trusted for
+#DATA_DIR without looking at them. Otherwise two stat calls settle it when
+#size and mtime still match, files copied since are read and compared by
+#digest. Anything else is parsed as text
+def _parse(data_dir):
+	d = _tables_data
+	if d is not None and (
+		(getattr(d, "BUILT", False) and os.path.abspath(data_dir) == DATA_DIR) or
+		getattr(d, "STAT", None) == _stat(data_dir)
+	):
+		return _freeze(d.R_MAP, d.INSTR_DATA, d.INSTR_FIELDS, d.DIGEST, d.OPERANDS)
+	texts = _read(data_dir)
+	if d is not None and d.DIGEST == _digest(*texts):
+		return _freeze(d.R_MAP, d.INSTR_DATA, d.INSTR_FIELDS, d.DIGEST, d.OPERANDS)
+	return _freeze(*_parse_text(*texts))
+
+#write the precompiled table module for the .dat files in data_dir, built
+#when they are the files shipped next to it (setup.py build_py)
+def write_module(path, data_dir = DATA_DIR, built = False):
+	r_p, i_data, i_fields, digest, operands = _parse_text(*_read(data_dir))
+	with open(path, "w") as f:
+		f.write("#generated from reg_map.dat and instr_data.dat by tables.write_module, do not edit\n")
+		f.write("BUILT = {!r}\n".format(built))
+		f.write("STAT = {!r}\n".format(_stat(data_dir)))
+		f.write("R_MAP = {!r}\n".format(r_p))
+		f.write("INSTR_DATA = {!r}\n".format(i_data))
+		f.write("INSTR_FIELDS = {!r}\n".format(i_fields))
+		f.write("DIGEST = {!r}\n".format(digest))
+		f.write("OPERANDS = {!r}\n".format(operands))
+
+#parsed tables, read from disk on first call only
+def load_tables():
+	global _tables
+	if _tables is None:
+		with _lock:
+			if _tables is None:
+				_tables = _parse(DATA_DIR)
+	return _tables
+
+#re-read the .dat files, converters created afterwards see the new tables
+def reload_tables(data_dir = None):
+	global _tables
+	with _lock:
+		_tables = _parse(DATA_DIR if data_dir is None else data_dir)
+	return _tables
@@ -1,6 +1,8 @@
-from pathlib import Path
 import math
 
+from .layout import layout
+from .tables import load_tables
+
 __all__ = ['Toolkit','nibbleForm']
 
 #-----------------------------------------------------------------------------------------		
@@ -8,10 +10,7 @@ __all__ = ['Toolkit','nibbleForm']
 #-----------------------------------------------------------------------------------------
 
 def nibbleForm(x,delim = '\t'):
-	fin_str = ""
-	for i in range(0,len(x),4):
-		fin_str += (x[i:i+4] + delim)
-	return fin_str[:-1]
+	return delim.join([x[i:i+4] for i in range(0,len(x),4)])
 
 def flatten(x):
 	arr = []
@@ -76,15 +75,20 @@ class Toolkit:
 		self.instr_data = {}
 		#get instruction data and register mapping
 		self.r_map, self.instr_data = self.__pre()
-		if filename != "":
-			self.code = self.__read_in_advance()
-		
+
 		self.all_instr = flatten([
 			R_instr, I_instr, S_instr,
 			SB_instr, U_instr, UJ_instr, 
 			pseudo_instr
 		])
 
+		#label table of filename, built on first use
+		self.code = []
+		self.line_addr = []
+		self.symbols = None
+		if filename != "":
+			self.code = self.__read_in_advance()
+
 		self.R_instr = R_instr
 		self.I_instr = I_instr
 		self.S_instr = S_instr
@@ -105,55 +109,15 @@ class Toolkit:
 		else:
 			return str(hex(int(x,2)))
 
+	#parsed once per process, see tables.load_tables
 	def __pre(self):
-		#register mapping
-		#make dictionary
-		
-		r_p = {}
-		rmap_path = Path(__file__).parent / "data/reg_map.dat"	
-		f = open(rmap_path,"r")
-		line = f.readline()
-
-		#assign mapping 
-		while line != "":
-			elems = line.split(" ")
-			r_p[elems[0]] = elems[1] 
-			line = f.readline()
-
-		f.close()
-		#index for instr_data
-
-		#order is [opcode, f3, f7]
-		i_data = {}
-		instr_path = Path(__file__).parent / "data/instr_data.dat"
-		f = open(instr_path,"r")
-		line = f.readline()
-
-		#assign data
-		while line != "":
-			elems = line.replace("\n","").split(" ")
-			i_data[elems[0]] = elems[1::]
-			line = f.readline()
-		f.close()
-
-		return r_p,i_data
-
+		tables = load_tables()
+		return tables.r_map, tables.instr_data
 
 	#READ FILE IN ADVANCE
 	def __read_in_advance(self):
-		code = []
-		file = open(self.filename, "r")
-
-		#store the lines in the arr
-		line = file.readline()
-		while line != "":
-			line = line.strip()
-			clean = flatten([elem.replace("\n","").split(",") for elem in line.split(" ")])
-			if line == "" or not self.__valid_line(clean, True):
-				line = file.readline()
-				continue
-			code.append(line.strip())
-			line = file.readline()
+		with open(self.filename, "r") as file:
+			code, self.line_addr, self.symbols = layout(file, self.all_instr)
 
 		return code
 
@@ -175,14 +139,13 @@ class Toolkit:
 		return fin_bin[len(fin_bin)-size:len(fin_bin)]
 
 	def calcJump(self, x,line_num, filename):
-		#calc line number of func
-		self.filename = filename
-		self.code = self.__read_in_advance()
-		for i in range(len(self.code)):
-			if x+":" == self.code[i]:
-				return (i - line_num)*4 #how many instructions to jump ahead/behind
-		#print("Address not found")
-		return -10 #if not found
+		#only lay the file out again when it changes
+		if filename != self.filename or self.symbols is None:
+			self.filename = filename
+			self.code = self.__read_in_advance()
+		if x not in self.symbols:
+			return -10 #if not found
+		return self.symbols[x] - self.line_addr[line_num] #how many bytes to jump ahead/behind
 
 	def R_type(
 			self, instr, rs1, 
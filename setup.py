@@ -1,4 +1,18 @@
+import os
 import setuptools
+from setuptools.command.build_py import build_py
+
+#precompiles the .dat tables into riscv_assembler/_tables_data.py, loading
+#that at runtime is cheaper than parsing the text files. Written from the
+#copies in build_lib, the ones installed next to it, so it is trusted as is
+class BuildPyWithTables(build_py):
+    def run(self):
+        super().run()
+        from riscv_assembler.tables import write_module
+        target = os.path.join(self.build_lib, 'riscv_assembler', '_tables_data.py')
+        if not self.dry_run:
+            write_module(target, os.path.join(self.build_lib, 'riscv_assembler', 'data'), built = True)
+            self.byte_compile([target])
 
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
@@ -11,7 +25,7 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/kcelebi/riscv-assembler",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=['benchmarks', 'benchmarks.*']),
     package_data={'riscv_assembler':['data/*.dat']},
     classifiers=[
         "Development Status :: 3 - Alpha",
@@ -19,7 +33,10 @@ setuptools.setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent"
     ],
-    install_requires=['bitstring==3.1.7'],
-   # dependency_links = ["https://pypi.org/project/bitstring/"],
-    python_requires='>=3'
+    extras_require={'fast': ['numpy']},
+    entry_points={
+        'console_scripts': ['riscv-assembler-server=riscv_assembler.server:main']
+    },
+    python_requires='>=3',
+    cmdclass={'build_py': BuildPyWithTables}
 )
\ No newline at end of file
@@ -0,0 +1,9 @@
+.globl square, exit
+
+# [1]*[1]
+square:
+	add [1] [1]
+	jalr [1] 0
+exit:
+	ecall
+	bne [1] [2] square
@@ -0,0 +1,9 @@
+.globl main
+
+main:
+	addi [0] 1
+	jal square
+	beqz [1] done
+	j exit
+done:
+	nop
@@ -0,0 +1,8 @@
+addi [0] 1
+loop: addi [1] 2 # same line label
+li x1 5000
+beq [1] [2] loop
+j end
+nop
+end:
+	ret
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from benchmarks.generate import *
+from riscv_assembler.convert import *
+
+def func0():
+	#test the generator is seeded
+	return list(generate_lines(200, seed = 3)), list(generate_lines(200, seed = 3)), list(generate_lines(200, seed = 4))
+
+def func1(tmp_path):
+	#test a generated program uses every mnemonic and assembles
+	path = generate(str(tmp_path / "gen.s"), 3000, seed = 1)
+	used = set()
+	with open(path) as f:
+		for line in f:
+			tok = line.split()
+			if len(tok) > 0 and tok[0] in AssemblyConverter.formats:
+				used.add(tok[0])
+	return used, AssemblyConverter().convert_ret(path)
+
+def test_0():
+	a, b, c = func0()
+	assert a == b and a != c
+
+def test_1(tmp_path):
+	used, out = func1(tmp_path)
+	assert used == set(AssemblyConverter.formats)
+	assert len(out) >= 3000
+
+def test_2():
+	#import plus the first converter stays cheap and leaves the heavy modules out,
+	#the budget here is loose, benchmarks/import_time.py holds the real one
+	from benchmarks.import_time import check
+	ok, result = check(budget = 500, runs = 3)
+	assert ok and result["loaded"] == []
@@ -0,0 +1,31 @@
+from riscv_assembler.buffer import *
+from riscv_assembler.convert import *
+from pathlib import Path
+
+WORDS = [0x2100100033, 0x100010013]
+
+def func0():
+	#test the views of a buffer
+	buf = InstructionBuffer(WORDS)
+	return [list(buf.as_ints()), buf.as_hex(), buf.as_bin()[0], buf.as_nibbles()[1], buf.nbytes()]
+
+def func1():
+	#test convert_ret hands back a buffer that still compares to strings
+	cnv = AssemblyConverter(hexMode = True)
+	path = Path(__file__).parent / "assembly/straight/extend.s"
+	return cnv.convert_ret(str(path))
+
+def test_0():
+	assert func0() == [
+		WORDS, ['0x2100100033', '0x100010013'],
+		'000010000100000000000100000000000000110011',
+		'0000\t0000\t0100\t0000\t0000\t0000\t0100\t0000\t0000\t0100\t11',
+		16
+	]
+
+def test_1():
+	buf = func1()
+	assert isinstance(buf, InstructionBuffer)
+	assert buf[0] == '0x2100100033' and buf[-2:] == ['0x00064037', '0x0080006f']
+	assert buf == InstructionBuffer(buf.as_ints(), hexMode = True)
+	assert buf.as_ints().itemsize == 8
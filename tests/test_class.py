@@ -89,6 +89,65 @@ def func8():
 
 	return out_arr
 
+def func9():
+	#test extended operands through the integer encoders
+	cnv = AssemblyConverter(hexMode = True)
+
+	path = Path(__file__).parent / "assembly/straight/extend.s"
+	return cnv.convert_ret(str(path))
+
+def func10():
+	#test R_type()/S_type() render the 42 bit word
+	out_arr = []
+
+	cnv = AssemblyConverter()
+	out_arr.append(cnv.R_type("add", 32, 33))
+	out_arr.append(cnv.S_type("sw", 35, 36, 0))
+
+	return out_arr
+
+def func11(verbose):
+	#test quiet default and opt in trace
+	cnv = AssemblyConverter(verbose = verbose)
+
+	path = Path(__file__).parent / "assembly/test0.s"
+	return cnv.convert_ret(str(path))
+
+def func12():
+	#test calcJump() with same line labels and two word li
+	path = Path(__file__).parent / "assembly/test5.s"
+
+	cnv = AssemblyConverter(filename = str(path))
+
+	return [cnv.calcJump("loop",3), cnv.calcJump("end",4), cnv.calcJump("nowhere",0)]
+
+def func13():
+	#test iter_convert() on a path, a file object and plain lines
+	out_arr = []
+	cnv = AssemblyConverter()
+
+	path = Path(__file__).parent / "assembly/straight/a.s"
+	cnv.convert_ret(str(path))
+	out_arr.append(list(cnv.words))
+
+	out_arr.append(list(cnv.iter_convert(str(path))))
+	with open(path) as f:
+		out_arr.append(list(cnv.iter_convert(f)))
+	with open(path) as f:
+		out_arr.append(list(cnv.iter_convert(line for line in f.readlines())))
+
+	return out_arr
+
+def func15():
+	#test the dispatch table covers every supported mnemonic
+	cnv = AssemblyConverter()
+	return [x for x in cnv.all_instr if x not in cnv.dispatch], cnv.dispatch["bgt"][0], cnv.dispatch["sw"][0]
+
+def func16():
+	#test the branch pseudo instructions
+	cnv = AssemblyConverter()
+	return list(cnv.iter_convert(["beqz [1] 8", "beq [1] x0 8", "ebreak"]))
+
 #-----------------------------------------------------------------------------------------		
 #-----------------------------------------------------------------------------------------
 #-----------------------------------------------------------------------------------------
@@ -119,4 +178,53 @@ def test_7():
 	assert func7() == 4
 
 def test_8():
-	assert func8() == ['0x000000b3', '0x02040293']
\ No newline at end of file
+	assert func8() == ['0x000000b3', '0x02040293']
+
+def test_9():
+	assert func9() == ['0x2100100033', '0x100010013', '0x210041a023', '0x2100628463', '0x00064037', '0x0080006f']
+
+def test_10():
+	assert func10() == ['000010000100000000000100000000000000110011', '000010000100000000010000011010000000100011']
+
+def test_11(capsys, caplog):
+	caplog.set_level("DEBUG", logger = "riscv_assembler")
+	func11(False)
+	assert capsys.readouterr().out == ""
+	assert caplog.records == []
+
+	func11(True)
+	assert capsys.readouterr().out == ""
+	assert [r.levelname for r in caplog.records] == ["DEBUG"]
+
+def test_12():
+	assert func12() == [-12, 8, -10]
+
+def test_13():
+	out_arr = func13()
+	assert len(out_arr[0]) == 11
+	assert out_arr[1] == out_arr[0] and out_arr[2] == out_arr[0] and out_arr[3] == out_arr[0]
+
+def test_14():
+	cnv = AssemblyConverter()
+	with pytest.raises(UnknownLabel):
+		list(cnv.iter_convert(["j nowhere", "nop"]))
+
+def test_15():
+	assert func15() == ([], "pseudo", "S")
+
+def test_16():
+	beqz, beq, ebreak = func16()
+	assert beqz == beq
+	assert ebreak == 0x00100073
+
+def func17(lines):
+	#test offset(base) memory operands keep their base
+	return list(AssemblyConverter().iter_convert(lines))
+
+def test_17():
+	#lw base imm, rd dropped, sw base rs2 imm
+	assert func17(["lw [1] 8([2])", "lw [1] 8([500])", "lw 8([2])"]) == [0x812003, 0xf008a2003, 0x812003]
+	assert func17(["sw [1] 4([2])", "jalr x0 4(x1)"]) == [0x112223, 0x408067]
+	assert func17(["sw [1] 4([2])"]) == func17(["sw [2] [1] 4"])
+	with pytest.raises(ValueError):
+		func17(["sw 4([2])"])
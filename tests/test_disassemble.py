@@ -0,0 +1,52 @@
+from riscv_assembler.disassemble import *
+from riscv_assembler.convert import *
+import riscv_assembler.encoding as encoding
+from pathlib import Path
+import pytest
+
+def func0(tmp_path, monkeypatch):
+	#test a .bin written by convert() disassembles to source assembling to the same words
+	monkeypatch.chdir(tmp_path)
+	cnv = AssemblyConverter(output_type = 'b')
+	cnv.convert(str(Path(__file__).parent / "assembly/straight/extend.s"))
+	lines = Disassembler().disassemble("extend/bin/extend.bin")
+	return lines, list(cnv.words), list(cnv.iter_convert(lines))
+
+def func1(use_numpy, monkeypatch):
+	#test the vectorized and plain decoders agree
+	cnv = AssemblyConverter()
+	words = list(cnv.iter_convert(["addi [3] -7", "beq [1] [700] -2048", "jal -4", "sw [1] [2] 12", "ecall", "ebreak"]*100))
+	if not use_numpy:
+		monkeypatch.setattr(encoding, "_np", None)
+	return list(Disassembler().iter_words(words))
+
+def test_0(tmp_path, monkeypatch):
+	lines, words, again = func0(tmp_path, monkeypatch)
+	assert lines == ["add [32] [33]", "addi [34] 0", "sw [35] [36] 0", "beq [37] [38] 4", "lui 100", "jal 4"]
+	assert again == words
+
+def test_1(monkeypatch):
+	if encoding._numpy() is None:
+		pytest.skip("numpy not installed")
+	assert func1(True, monkeypatch) == func1(False, monkeypatch)
+
+def test_2(monkeypatch):
+	lines = func1(False, monkeypatch)
+	assert lines[:6] == ["addi [3] -7", "beq [1] [700] -2048", "jal -4", "sw [1] [2] 12", "ecall", "ebreak"]
+
+def test_3(tmp_path):
+	dis = Disassembler()
+	assert dis.decode(0x7F) == "# unknown 0x0000007f"
+	(tmp_path / "bad.bin").write_bytes(b"\0"*12)
+	with pytest.raises(TruncatedImage):
+		dis.disassemble(str(tmp_path / "bad.bin"))
+
+def test_4(tmp_path, monkeypatch):
+	#a packed bitstream .bin disassembles the same as a padded one
+	monkeypatch.chdir(tmp_path)
+	path = str(Path(__file__).parent / "assembly/straight/extend.s")
+	AssemblyConverter(output_type = 'b', packed = 42).convert(path)
+	packed = tmp_path / "extend/bin/extend.bin"
+	#6 words of 42 bits instead of 6*8 bytes
+	assert packed.stat().st_size == 13 + 32
+	assert Disassembler().disassemble(str(packed)) == func0(tmp_path, monkeypatch)[0]
@@ -0,0 +1,44 @@
+from riscv_assembler.convert import *
+from pathlib import Path
+
+def func0():
+	#test the cache changes nothing in the output
+	path = Path(__file__).parent / "assembly"
+	res = []
+	for f in ["test0.s", "test3.s", "test5.s", "straight/extend.s"]:
+		cached = AssemblyConverter(output_type = 'r', cache_size = 4096).convert(str(path / f)).as_text()
+		plain = AssemblyConverter(output_type = 'r').convert(str(path / f)).as_text()
+		res.append(cached == plain)
+	return res
+
+def func1():
+	#test equal lines share an entry and branches stay out of the cache
+	cnv = AssemblyConverter(cache_size = 4096)
+	lines = ["add x1, x2", "add x1 x2", "beq x1 x2 0", "beq x1 x2 0", "li x1, 5", "li x1 5", "lw x1, 0(x2)", "lw x2 0"]
+	words = list(cnv.iter_convert(lines))
+	return words, cnv.cacheInfo()
+
+def func2():
+	#test the bound and turning it off
+	lines = ["addi x1 {}".format(i) for i in range(10)]
+	small = AssemblyConverter(cache_size = 4)
+	list(small.iter_convert(lines))
+	#off by default
+	off = AssemblyConverter()
+	list(off.iter_convert(lines))
+	return small.cacheInfo(), off.cacheInfo()
+
+def test_0():
+	assert all(func0())
+
+def test_1():
+	words, info = func1()
+	assert words[0] == words[1] and words[4] == words[5] and words[6] == words[7]
+	#the memory form and the plain lw are different keys for the same word
+	assert info["hits"] == 2 and info["misses"] == 4
+	assert info["size"] == 4 and info["hit_rate"] == 2/6
+
+def test_2():
+	small, off = func2()
+	assert small["size"] == 4 and small["misses"] == 10
+	assert off == {"hits": 0, "misses": 0, "size": 0, "maxsize": 0, "hit_rate": 0.0}
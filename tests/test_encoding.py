@@ -0,0 +1,93 @@
+from riscv_assembler.encoding import *
+import pytest
+
+WORDS = [0x2100100033, 0x100010013, 0x0080006f]
+
+def func0():
+	#test pack_words() for the default, big endian and odd widths
+	return [
+		pack_words(WORDS),
+		pack_words(WORDS, 8, 'big'),
+		pack_words(WORDS, 6)
+	]
+
+def func1(tmp_path, use_mmap):
+	#test write_image() with and without mmap
+	path = tmp_path / "out.bin"
+	write_image(str(path), WORDS, use_mmap = use_mmap)
+	return path.read_bytes()
+
+def func2(numpy, **kw):
+	#test render() with and without numpy
+	from riscv_assembler import encoding
+	words = [(w*0x9E3779B97) & (2**42 - 1) for w in range(1000)]
+	if not numpy:
+		encoding._np = None
+	try:
+		return render(words, **kw)
+	finally:
+		encoding._np = False
+
+def test_0():
+	little, big, narrow = func0()
+	assert little == b"".join([w.to_bytes(8, 'little') for w in WORDS])
+	assert big == b"".join([w.to_bytes(8, 'big') for w in WORDS])
+	assert narrow == b"".join([w.to_bytes(6, 'little') for w in WORDS])
+
+def test_1(tmp_path):
+	assert func1(tmp_path, True) == func1(tmp_path, False) == pack_words(WORDS)
+
+def test_2():
+	with pytest.raises(OverflowError):
+		pack_words(WORDS, 4)
+
+@pytest.mark.parametrize("kw", [{}, {"nibble": True}, {"hexMode": True}, {"width": 64, "nibble": True}])
+def test_3(kw):
+	pytest.importorskip("numpy")
+	out = func2(True, **kw)
+	assert out == func2(False, **kw)
+	assert len(out) == 1000
+
+def func3(numpy, width, n):
+	#test pack_stream()/unpack_stream() with and without numpy
+	from riscv_assembler import encoding
+	words = [(w*0x9E3779B97) & (2**42 - 1) for w in range(n)]
+	if not numpy:
+		encoding._np = None
+	try:
+		data = pack_stream(words, width)
+		return words, data, unpack_stream(data)
+	finally:
+		encoding._np = False
+
+@pytest.mark.parametrize("width", [42, 43, 54, 64])
+@pytest.mark.parametrize("n", [0, 3, 8, 1000])
+def test_4(width, n):
+	words, data, (w, back) = func3(False, width, n)
+	#13 byte header, then width bits a word
+	assert len(data) == 13 + (n*width + 7)//8
+	assert w == width and list(back) == words
+	if n == 3:
+		assert data[13:] == sum(x << (i*width) for i, x in enumerate(words)).to_bytes(len(data) - 13, 'little')
+
+@pytest.mark.parametrize("width", [42, 54])
+def test_5(width):
+	pytest.importorskip("numpy")
+	assert func3(True, width, 1000) == func3(False, width, 1000)
+
+def test_6():
+	with pytest.raises(OverflowError):
+		pack_stream(WORDS, 32)
+	with pytest.raises(BadPackedStream):
+		unpack_stream(pack_stream(WORDS)[:-1])
+	with pytest.raises(BadPackedStream):
+		unpack_stream(pack_words(WORDS))
+
+def test_7():
+	#a short program is rendered and packed without importing numpy
+	import subprocess, sys
+	probe = ("import sys\nfrom riscv_assembler.encoding import *\n"
+		"unpack_bits(pack_bits([1, 2], 42), 42, 2)\nrender_text([1, 2], hexMode = True)\n"
+		"print('numpy' in sys.modules)")
+	out = subprocess.run([sys.executable, "-c", probe], stdout = subprocess.PIPE, universal_newlines = True, check = True)
+	assert out.stdout.strip() == "False"
@@ -0,0 +1,47 @@
+from riscv_assembler.instrument import *
+from riscv_assembler.convert import *
+from riscv_assembler.project_convert import *
+from pathlib import Path
+
+def func0():
+	#test the counters of a single file, reported through the callback
+	reports = []
+	cnv = AssemblyConverter(output_type = 'r', stats = Stats(reports.append))
+	path = Path(__file__).parent / "assembly/test5.s"
+	cnv.convert(str(path))
+	return reports
+
+def func1(workers):
+	#test project totals, with and without a process pool
+	path = Path(__file__).parent / "assembly"
+	stats = Stats()
+	pc = ProjectConverter(root = str(path), output_type = 'r', workers = workers, stats = stats)
+	pc.convert()
+	return stats.as_dict()
+
+def test_0():
+	reports = func0()
+	assert len(reports) == 1
+	assert reports[0]["counters"] == {
+		"lines_read": 8, "lines_code": 7, "lines_skipped": 1,
+		"instr_I": 2, "instr_SB": 1, "instr_pseudo": 5
+	}
+	assert sorted(reports[0]["times"]) == ["encode", "read"]
+
+def test_1(tmp_path, monkeypatch):
+	monkeypatch.chdir(tmp_path)
+	stats = Stats()
+	cnv = AssemblyConverter(output_type = 'bt', stats = stats)
+	cnv.convert(str(Path(__file__).parent / "assembly/test0.s"))
+	#one 8 byte word plus 65 bytes of text
+	assert stats.counters["bytes_written"] == 8 + 65
+	assert sorted(stats.times) == ["encode", "read", "render", "write"]
+
+def test_2():
+	counters = func1(1)["counters"]
+	assert counters["files"] == 6 and counters["files_failed"] == 3
+	assert counters == func1(2)["counters"]
+
+def test_3():
+	#off by default
+	assert AssemblyConverter().getStats() is None
@@ -0,0 +1,40 @@
+from riscv_assembler.layout import *
+import pytest
+
+def func0():
+	#test tokenizing tabs, memory operands, distances and comments
+	return [
+		tokenize("\tsw s0,\t0(sp)  # spill"),
+		tokenize("add [3],[12]#no space"),
+		tokenize("# only a comment"),
+		tokenize("")
+	]
+
+def func1():
+	#test labels and the interned mnemonic
+	labels, clean = parse_line("a: b:\taddi [1] 2\n")
+	other = parse_line("addi [2] 3")[1]
+	return labels, clean, clean[0] is other[0], parse_line("end:"), parse_line("\t.text")
+
+def test_0():
+	assert func0() == [["sw", "s0", "0", "sp"], ["add", "[3]", "[12]"], [], []]
+
+def test_1():
+	labels, clean, same, end, text = func1()
+	assert labels == ["a", "b"] and clean == ["addi", "[1]", "2"]
+	assert same
+	assert end == (["end"], None) and text == ([], None)
+
+def func2():
+	#test offset(base) operands put the base first
+	return [
+		parse_line("sw s0, 8(sp)")[1],
+		parse_line("lw s0, 8(sp) # the (base) in a comment")[1],
+		parse_line("lw 8([2])")[1],
+		parse_line("addi [1] 2 # (not memory)")[1]
+	]
+
+def test_2():
+	assert func2() == [["sw", "sp", "s0", "8"], ["lw", "sp", "s0", "8"], ["lw", "[2]", "8"], ["addi", "[1]", "2"]]
+	with pytest.raises(BadMemoryOperand):
+		parse_line("sw [1] [3] 4([2])")
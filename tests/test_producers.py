@@ -0,0 +1,73 @@
+from riscv_assembler.producers import *
+from riscv_assembler.layout import *
+from riscv_assembler.convert import *
+import pytest
+
+NAMED = [
+	"%a:   addi [0] 1",
+	"%b:   addi [0] 2",
+	"      nop",
+	"%sum: add %a %b",
+	"      sw %sum %a 0",
+	"%big: li x1 5000",
+	"%i:",
+	"      addi %big 1",
+	"%i:   addi %i 1",
+	"      add %i %i"
+]
+
+def func0():
+	#test names become distances, the two word li and redefinitions included
+	cnv = AssemblyConverter()
+	code = layout(NAMED, cnv.formats)[0]
+	return code, list(cnv.iter_convert(NAMED)), list(cnv.iter_convert([" ".join(x) for x in code]))
+
+def func1():
+	#test every bad reference is reported at once
+	lines = ["%a: addi [0] 1", "add %b %a", "add %a [9000000]", "sub %c %a"]
+	try:
+		layout(lines, AssemblyConverter.formats)
+	except ProducerError as e:
+		return e.problems
+
+def test_0():
+	code, named, plain = func0()
+	assert code[3:] == [
+		["add", "[3]", "[2]"], ["sw", "[1]", "[4]", "0"], ["li", "x1", "5000"],
+		["addi", "[1]", "1"], ["addi", "[1]", "1"], ["add", "[1]", "[1]"]
+	]
+	assert named == plain
+
+def test_1():
+	assert func1() == [
+		(1, "%b", "has no producer above it"),
+		(2, "[9000000]", "is more than the 1023 words back an operand can reach"),
+		(3, "%c", "has no producer above it")
+	]
+
+def test_2():
+	#%labels aren't branch targets, and a file without any producer still reports the name
+	assert symbol_table(NAMED, AssemblyConverter.formats) == {}
+	with pytest.raises(ProducerError):
+		AssemblyConverter().convert_string("add %a [1]\n")
+
+def func3():
+	#test distances past the 10 bit field, named or written by hand, with or without producers
+	far = ["%a: addi [0] 1"] + ["nop"]*1100 + ["add %a %a"]
+	res = []
+	for lines in [far, ["addi [0] 1", "add [1024] [3]", "sub [1] [5000]"]]:
+		try:
+			AssemblyConverter().convert_lines(lines)
+		except ProducerError as e:
+			res.append(e.problems)
+	return res
+
+def test_3():
+	named, literal = func3()
+	assert named == [(1101, "%a", "is 1101 words back, more than the 1023 an operand can reach")]*2
+	assert literal == [
+		(1, "[1024]", "is more than the 1023 words back an operand can reach"),
+		(2, "[5000]", "is more than the 1023 words back an operand can reach")
+	]
+	#the farthest one that fits
+	assert len(AssemblyConverter().convert_lines(["add [1023] [1]"])) == 1
@@ -0,0 +1,93 @@
+from riscv_assembler.project_convert import *
+from riscv_assembler.convert import *
+from riscv_assembler.link import *
+from pathlib import Path
+import pytest
+
+def func0(workers):
+	#test convert of a whole directory, with and without a process pool
+	path = Path(__file__).parent / "assembly"
+	pc = ProjectConverter(root = str(path), output_type = 'r', hexMode = True, workers = workers)
+
+	return pc.convert(), pc.getFailedConvert()
+
+def test_0():
+	instr, failed = func0(1)
+	assert failed == ['test1.s', 'test2.s', 'test4.s']
+	assert sorted(instr.keys()) == ['test0.s', 'test3.s', 'test5.s']
+	assert instr['test0.s'] == ['0x00008033']
+
+def test_1():
+	assert func0(2) == func0(1)
+
+def func1(cache_dir):
+	#test the incremental build cache
+	path = Path(__file__).parent / "assembly/straight"
+	pc = ProjectConverter(root = str(path), output_type = 'r', cache_dir = str(cache_dir))
+	first = dict(pc.convert())
+	stats = dict(pc.getCacheStats())
+	pc.cache.resetStats()
+	pc.instr = {}
+	return first, stats, pc.convert(), pc.getCacheStats()
+
+def test_2(tmp_path):
+	first, stats, second, stats2 = func1(tmp_path)
+	assert stats == {"hits": 0, "misses": 4}
+	assert stats2 == {"hits": 4, "misses": 0}
+	assert second == first and len(first) == 4
+
+def test_3(tmp_path):
+	func1(tmp_path)
+	#other options miss the cache
+	path = Path(__file__).parent / "assembly/straight"
+	pc = ProjectConverter(root = str(path), output_type = 'r', hexMode = True, cache_dir = str(tmp_path))
+	pc.convert()
+	assert pc.getCacheStats() == {"hits": 0, "misses": 4}
+
+def func4(tmp_path):
+	#test linking main.s against lib.s, the same as assembling them as one file
+	path = Path(__file__).parent / "assembly/linked"
+	pc = ProjectConverter(root = str(path), output_type = 'r', hexMode = True)
+	image = pc.link(['main.s', 'lib.s'])
+
+	joined = tmp_path / "joined.s"
+	joined.write_text((path / "main.s").read_text() + (path / "lib.s").read_text())
+	whole = AssemblyConverter(output_type = 'r', hexMode = True).convert_ret(str(joined))
+	return pc, image, whole
+
+def test_4(tmp_path):
+	pc, image, whole = func4(tmp_path)
+	assert image == whole and len(image) == 9
+	assert pc.getSymbols() == {"main": 0, "square": 20, "exit": 28}
+
+def test_5(tmp_path):
+	#relinking only assembles what changed
+	pc, image, whole = func4(tmp_path)
+	lib = pc.objects['lib.s']
+	pc.objects['main.s'] = pc.objects['main.s']._replace(digest = "stale")
+	assert pc.assemble(['main.s', 'lib.s']) == ['main.s']
+	assert pc.objects['lib.s'] is lib
+	assert pc.link(['main.s', 'lib.s']) == image
+
+def test_6():
+	#a target nobody exports
+	path = Path(__file__).parent / "assembly/linked"
+	pc = ProjectConverter(root = str(path), output_type = 'r')
+	with pytest.raises(UnresolvedSymbol):
+		pc.link(['main.s'])
+
+def test_7(tmp_path):
+	#link() writes the .bin in the converter's layout
+	from riscv_assembler.encoding import unpack_words, unpack_stream, WORD_BITS
+	path = Path(__file__).parent / "assembly/linked"
+	pc = ProjectConverter(root = str(path), output_type = 'r', word_bytes = 8, byteorder = 'big')
+	pc.link(['main.s', 'lib.s'], filename = str(tmp_path / "a.bin"))
+	words = list(pc.image.words)
+	assert list(unpack_words((tmp_path / "a.bin").read_bytes(), 8, 'big')) == words
+
+	pc.setPacked(WORD_BITS)
+	assert pc.getPacked() == WORD_BITS
+	pc.link(['main.s', 'lib.s'], filename = str(tmp_path / "b.bin"))
+	width, packed = unpack_stream((tmp_path / "b.bin").read_bytes())
+	assert width == WORD_BITS and list(packed) == words
+	assert ProjectConverter(root = str(path), packed = WORD_BITS).getPacked() == WORD_BITS
@@ -0,0 +1,38 @@
+from riscv_assembler.pseudo import *
+from riscv_assembler.layout import *
+from riscv_assembler.convert import *
+
+def func0():
+	#test the expansions of a few pseudo instructions
+	return [
+		expand(["bgt", "[1]", "[2]", "loop"]),
+		expand(["li", "x1", "5"]),
+		expand(["li", "x1", "5000"]),
+		expand(["li", "x1", "-2049"])
+	]
+
+def func1():
+	#test addresses after li of every size, the j must land on end
+	cnv = AssemblyConverter()
+	lines = ["li x1 2047", "li x1 2048", "li x1 -2048", "li x1 -70000", "j end", "nop", "end:", "ret"]
+	code, line_addr, symbols = layout(lines, cnv.formats)
+	return line_addr, symbols, list(cnv.iter_convert(lines))
+
+def test_0():
+	assert func0() == [
+		[["blt", "[2]", "[1]", "loop"]],
+		[["addi", "x0", "5"]],
+		[["lui", "1"], ["addi", "[1]", "904"]],
+		[["lui", "-1"], ["addi", "[1]", "2047"]]
+	]
+
+def test_1():
+	for imm in [0, 2047, 2048, -2048, -2049, 5000, 0x7FFFF7FF, -2**31]:
+		hi, lo = split_imm(imm)
+		assert (hi << 12) + lo == imm and fits_imm12(lo)
+
+def test_2():
+	line_addr, symbols, words = func1()
+	assert line_addr == [0, 4, 12, 16, 24, 28, 32] and symbols == {"end": 32}
+	#jal 8 from the j at 24
+	assert len(words) == 9 and words[6] == int(AssemblyConverter().UJ_type("jal", 8), 2)
@@ -0,0 +1,87 @@
+from riscv_assembler.server import *
+from pathlib import Path
+import io
+import json
+import socket
+import threading
+import time
+import pytest
+
+PATH = str(Path(__file__).parent / "assembly/test0.s")
+
+def func0():
+	#test requests answered by one warm pool
+	pool = ConverterPool()
+	replies = [
+		handle({"id": 1, "file": PATH, "hexMode": True}, pool),
+		handle({"id": 2, "files": [PATH, "missing.s"], "hexMode": True}, pool),
+		handle({"op": "stats"}, pool),
+		handle({"op": "nope"}, pool)
+	]
+	return replies
+
+def func1():
+	#test the stdin/stdout protocol
+	stdin = io.StringIO("\n".join([
+		json.dumps({"id": 1, "file": PATH}), "not json",
+		json.dumps({"op": "shutdown"}), json.dumps({"id": 2, "file": PATH})
+	]) + "\n")
+	stdout = io.StringIO()
+	serve_stdio(stdin, stdout)
+	return [json.loads(x) for x in stdout.getvalue().splitlines()]
+
+def test_0():
+	one, batch, stats, bad = func0()
+	assert one == {"id": 1, "ok": True, "file": PATH, "count": 1, "instructions": ["0x00008033"]}
+	assert [r["ok"] for r in batch["results"]] == [True, False]
+	assert "FileNotFoundError" in batch["results"][1]["error"]
+	#both requests shared a converter
+	assert stats == {"ok": True, "converters": 1}
+	assert bad["ok"] is False
+
+def test_1():
+	replies = func1()
+	assert len(replies) == 3
+	assert replies[0]["instructions"] == [format(0x8033, "064b")]
+	assert replies[1]["ok"] is False and replies[2] == {"ok": True}
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason = "no unix sockets")
+def test_2(tmp_path):
+	path = str(tmp_path / "asm.sock")
+	thread = threading.Thread(target = serve_socket, args = (path,), daemon = True)
+	thread.start()
+	for _ in range(100):
+		try:
+			sock = socket.socket(socket.AF_UNIX)
+			sock.connect(path)
+			break
+		except OSError:
+			time.sleep(0.02)
+	f = sock.makefile("rw")
+	f.write(json.dumps({"id": 7, "file": PATH, "hexMode": True}) + "\n" + json.dumps({"op": "shutdown"}) + "\n")
+	f.flush()
+	assert json.loads(f.readline())["instructions"] == ["0x00008033"]
+	assert json.loads(f.readline()) == {"ok": True}
+	sock.close()
+	thread.join(5)
+	assert not thread.is_alive()
+
+def test_3():
+	#source is assembled without a file
+	pool = ConverterPool()
+	with open(PATH) as f:
+		reply = handle({"id": 4, "source": f.read(), "hexMode": True}, pool)
+	assert reply == {"id": 4, "ok": True, "count": 1, "instructions": ["0x00008033"]}
+	assert handle({"source": "bogus x1 x2 x3\n"}, pool)["ok"] is False
+	#same width as a file request
+	with open(PATH) as f:
+		source = handle({"source": f.read()}, pool)
+	assert source["instructions"] == handle({"file": PATH}, pool)["instructions"] == [format(0x8033, "064b")]
+
+def test_4(capsys):
+	#"p" never prints into the reply stream, the text comes back in the reply
+	stdin = io.StringIO(json.dumps({"id": 5, "file": PATH, "output_type": "p", "hexMode": True}) + "\n")
+	stdout = io.StringIO()
+	serve_stdio(stdin, stdout)
+	assert capsys.readouterr().out == ""
+	assert [json.loads(x)["instructions"] for x in stdout.getvalue().splitlines()] == [["0x00008033"]]
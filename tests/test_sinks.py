@@ -0,0 +1,80 @@
+from riscv_assembler.sinks import *
+from riscv_assembler.project_convert import *
+from riscv_assembler.convert import *
+from pathlib import Path
+import tarfile
+import zipfile
+import pytest
+
+ROOT = str(Path(__file__).parent / "assembly")
+
+def project(sink, workers = 1):
+	pc = ProjectConverter(root = ROOT, output_type = 'bt', workers = workers, sink = sink)
+	pc.convert()
+	return pc
+
+def func0(tmp_path, monkeypatch):
+	#test every backend holds what convert() writes without a sink
+	monkeypatch.chdir(tmp_path)
+	project(None)
+	disk = dict(
+		(str(p.relative_to(tmp_path)), p.read_bytes())
+		for p in tmp_path.rglob("*") if p.is_file()
+	)
+
+	memory = MemorySink()
+	project(memory)
+	with DirectorySink(str(tmp_path / "tree")) as sink:
+		project(sink)
+	tree = dict(
+		(str(p.relative_to(tmp_path / "tree")), p.read_bytes())
+		for p in (tmp_path / "tree").rglob("*") if p.is_file()
+	)
+	with ArchiveSink(str(tmp_path / "out.zip")) as sink:
+		project(sink)
+	with zipfile.ZipFile(str(tmp_path / "out.zip")) as z:
+		zipped = dict((x, z.read(x)) for x in z.namelist())
+	with ArchiveSink(str(tmp_path / "out.tar.gz")) as sink:
+		project(sink)
+	with tarfile.open(str(tmp_path / "out.tar.gz")) as t:
+		tarred = dict((x.name, t.extractfile(x).read()) for x in t.getmembers())
+	with ImageSink(str(tmp_path / "out.img")) as sink:
+		project(sink)
+	image = read_image(str(tmp_path / "out.img"))
+	return disk, [memory.files, tree, zipped, tarred, image]
+
+def func1(tmp_path):
+	#test writes wait for the buffer to fill or a flush
+	sink = DirectorySink(str(tmp_path), buffer_size = 10)
+	sink.write("a/a.bin", b"12345")
+	before = (tmp_path / "a/a.bin").exists()
+	sink.write("b/b.bin", b"67890")
+	after = (tmp_path / "a/a.bin").exists(), (tmp_path / "b/b.bin").exists()
+	sink.write("c/c.bin", b"x")
+	sink.close()
+	return before, after, (tmp_path / "c/c.bin").read_bytes()
+
+def test_0(tmp_path, monkeypatch):
+	disk, sinks = func0(tmp_path, monkeypatch)
+	#bin and txt of the three files that assemble
+	assert len(disk) == 6 and "test0/bin/test0.bin" in disk
+	for files in sinks:
+		assert files == disk
+
+def test_1():
+	one, two = MemorySink(), MemorySink()
+	project(one)
+	project(two, workers = 2)
+	assert one.files == two.files and len(one.files) == 6
+
+def test_2(tmp_path):
+	assert func1(tmp_path) == (False, (True, True), b"x")
+
+def test_3():
+	with pytest.raises(ValueError):
+		ArchiveSink("out.rar", kind = "rar")
+
+def test_4():
+	#a backend has to say how a batch is written
+	with pytest.raises(TypeError):
+		Sink()
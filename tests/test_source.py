@@ -0,0 +1,61 @@
+from riscv_assembler.convert import *
+from riscv_assembler.convert import EmptyFile
+from pathlib import Path
+import builtins
+import io
+import os
+import pytest
+
+PATH = Path(__file__).parent / "assembly/test5.s"
+
+def func0():
+	#test every kind of in memory source against the file
+	cnv = AssemblyConverter()
+	text = PATH.read_text()
+	with open(PATH) as f:
+		from_file = list(cnv.convert_lines(f))
+	return [
+		list(cnv.convert_ret(str(PATH))),
+		list(cnv.convert_string(text)),
+		list(cnv.convert_lines(text.splitlines())),
+		list(cnv.convert_lines(x for x in text.splitlines())),
+		from_file
+	]
+
+def func1(tmp_path, monkeypatch):
+	#test the streams get what convert() writes to the .bin and .txt
+	monkeypatch.chdir(tmp_path)
+	AssemblyConverter(output_type = 'bt').convert(str(PATH))
+	out, text_out = io.BytesIO(), io.BytesIO()
+	AssemblyConverter().convert_string(PATH.read_text(), out, text_out)
+	return (
+		out.getvalue(), (tmp_path / "test5/bin/test5.bin").read_bytes(),
+		text_out.getvalue(), (tmp_path / "test5/txt/test5.txt").read_bytes()
+	)
+
+def func2(monkeypatch):
+	#test nothing is opened or created on disk
+	text = PATH.read_text()
+	cnv = AssemblyConverter(output_type = 'bt')
+	def refuse(*args, **kw):
+		raise AssertionError("filesystem touched")
+	monkeypatch.setattr(builtins, "open", refuse)
+	monkeypatch.setattr(os, "makedirs", refuse)
+	monkeypatch.setattr(os, "mkdir", refuse)
+	return cnv.convert_string(text, io.BytesIO(), io.BytesIO())
+
+def test_0():
+	res = func0()
+	assert len(res[0]) == 8
+	assert all(x == res[0] for x in res)
+
+def test_1(tmp_path, monkeypatch):
+	out, bin_file, text_out, txt_file = func1(tmp_path, monkeypatch)
+	assert out == bin_file and text_out == txt_file
+
+def test_2(monkeypatch):
+	assert len(func2(monkeypatch)) == 8
+
+def test_3():
+	with pytest.raises(EmptyFile):
+		AssemblyConverter().convert_string("# nothing here\n")
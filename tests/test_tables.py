@@ -0,0 +1,108 @@
+from riscv_assembler.tables import *
+from riscv_assembler.convert import *
+from riscv_assembler.utils import *
+from riscv_assembler.producers import ProducerError
+from pathlib import Path
+import pytest
+
+def func0():
+	#converters share the tables parsed once per process
+	a = AssemblyConverter()
+	b = AssemblyConverter()
+	tk = Toolkit()
+	return [a.r_map is b.r_map, a.instr_fields is b.instr_fields, tk.instr_data is a.instr_data]
+
+def func1():
+	tables = load_tables()
+	return [tables.r_map["sp"], tables.r_map["[40]"], tables.instr_fields["sub"], tables.instr_data["sub"]]
+
+def test_0():
+	assert func0() == [True, True, True]
+
+def test_1():
+	assert func1() == [2, 40, (0b0110011, 0, 0b0100000), ("0110011", "000", "0100000")]
+
+def test_2():
+	with pytest.raises(TypeError):
+		load_tables().r_map["sp"] = 5
+
+def test_3():
+	old = load_tables()
+	new = reload_tables()
+	assert new is not old and new == old
+	assert AssemblyConverter().r_map is new.r_map
+
+def func4():
+	#test the operand table against the RegisterMap path
+	tables = load_tables()
+	operands = tables.operands
+	return [operands["sp"], operands["[0]"], operands["[1023]"], "[1024]" in operands,
+		all(operands[x] == tables.r_map[x] for x in tables.r_map)]
+
+def test_4():
+	assert func4() == [2, 0, 1023, False, True]
+
+def test_5():
+	#register numbers still wrap into the 10 bit field, a [N] past it is an error
+	cnv = AssemblyConverter()
+	assert cnv.R_type("add", 1025, 2) == cnv.R_type("add", 1, 2)
+	with pytest.raises(ProducerError):
+		list(cnv.iter_convert(["add [1025] x2"]))
+	assert load_tables().r_map["[1023]"] == 1023
+	with pytest.raises(ProducerError):
+		load_tables().r_map["[1024]"]
+
+def func6(tmp_path):
+	#test the precompiled module holds exactly what parsing the .dat files gives
+	import importlib.util
+	path = tmp_path / "_tables_data.py"
+	write_module(str(path))
+	spec = importlib.util.spec_from_file_location("_tables_data", str(path))
+	data = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(data)
+	tables = load_tables()
+	return data, tables
+
+def test_6(tmp_path):
+	data, tables = func6(tmp_path)
+	assert data.R_MAP == dict(tables.r_map) and data.INSTR_DATA == dict(tables.instr_data)
+	assert data.INSTR_FIELDS == dict(tables.instr_fields) and data.OPERANDS == dict(tables.operands)
+	assert data.DIGEST == tables.digest
+
+def func7(tmp_path, monkeypatch):
+	#test which tables _parse picks, the module's are marked with an extra register
+	import shutil, types
+	from riscv_assembler import tables
+	data_dir = tmp_path / "data"
+	data_dir.mkdir()
+	for name in ("reg_map.dat", "instr_data.dat"):
+		shutil.copy(str(Path(tables.DATA_DIR) / name), str(data_dir / name))
+	path = tmp_path / "_tables_data.py"
+	write_module(str(path), str(data_dir))
+	data = types.ModuleType("_tables_data")
+	exec(path.read_text(), data.__dict__)
+	data.R_MAP = dict(data.R_MAP, marker = 1)
+	monkeypatch.setattr(tables, "_tables_data", data)
+	res = ["marker" in tables._parse(str(data_dir)).r_map]
+	#touched (an install copying the files) but the same text
+	data.STAT = ((0, 0), (0, 0))
+	res.append("marker" in tables._parse(str(data_dir)).r_map)
+	#edited
+	with open(str(data_dir / "reg_map.dat"), "a") as f:
+		f.write("\nzz x1")
+	res.append("marker" in tables._parse(str(data_dir)).r_map)
+	return res
+
+def test_7(tmp_path, monkeypatch):
+	assert func7(tmp_path, monkeypatch) == [True, True, False]
+
+def test_8(monkeypatch):
+	#a module from build_py is used for the package's own files without reading them
+	import types
+	from riscv_assembler import tables
+	data = types.ModuleType("_tables_data")
+	data.BUILT, data.STAT, data.DIGEST = True, ((0, 0), (0, 0)), "stale"
+	data.R_MAP, data.INSTR_DATA, data.INSTR_FIELDS, data.OPERANDS = {"marker": 1}, {}, {}, {}
+	monkeypatch.setattr(tables, "_tables_data", data)
+	monkeypatch.setattr(tables, "_read", None)
+	assert "marker" in tables._parse(tables.DATA_DIR).r_map
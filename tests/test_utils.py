@@ -1,6 +1,5 @@
 from riscv_assembler.utils import *
 from pathlib import Path
-import pytest
 
 def func0():
 	return nibbleForm("000011110000010100001111",'\t')
@@ -9,8 +8,16 @@ def func1():
 	tk = Toolkit()
 	return tk.R_type('add', 'x0','x0','x0')
 
+def func2():
+	tk = Toolkit()
+	path = str(Path(__file__).parent / "assembly/test5.s")
+	return [tk.calcJump('loop', 3, path), tk.calcJump('end', 4, path)]
+
 def test_0():
 	assert func0() == "0000\t1111\t0000\t0101\t0000\t1111"
 
 def test_1():
-	assert func1() == '00000000000000000000000000110011'
\ No newline at end of file
+	assert func1() == '00000000000000000000000000110011'
+
+def test_2():
+	assert func2() == [-12, 8]